@@ -6,18 +6,26 @@ WebSocket сервер для трансляции высококачестве
 """
 
 import asyncio
-import json
 import logging
 import hashlib
+import hmac
 import secrets
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Set, Dict, Optional, List
+from typing import Dict, Optional, List
 import signal
 import sys
+import time
 
 import asyncpg
+import orjson
 import websockets
 
+try:
+    import uvloop  # Опционально: быстрый event loop (нет под Windows)
+except ImportError:
+    uvloop = None
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -30,6 +38,14 @@ logging.basicConfig(
 logger = logging.getLogger('HighScoreSignalWSServer')
 
 
+@dataclass(slots=True)
+class ClientState:
+    """Состояние подключенного клиента"""
+    ip: str
+    connected_at: datetime
+    authenticated: bool = False
+
+
 class HighScoreSignalWebSocketServer:
     """
     WebSocket сервер для стриминга высококачественных торговых сигналов
@@ -46,11 +62,28 @@ class HighScoreSignalWebSocketServer:
     - Время жизни сигнала: 32 минуты (настраиваемое)
     """
 
+    # Пороги, после которых CPU-работа уходит в поток (asyncio.to_thread)
+    ENCODE_IN_THREAD_THRESHOLD = 50    # сигналов в снимке
+    HASH_IN_THREAD_THRESHOLD = 2048    # символов в токене
+
+    # Максимум одновременных отправок при broadcast
+    BROADCAST_CONCURRENCY = 256
+
+    # Максимальный размер входящего сообщения клиента
+    MAX_MESSAGE_SIZE = 4096
+
+    # Фрагменты сообщения {'type': 'signals', 'timestamp', 'count', 'data'}
+    ENVELOPE_PREFIX = b'{"type":"signals","timestamp":'
+    ENVELOPE_COUNT = b',"count":'
+    ENVELOPE_DATA = b',"data":'
+    ENVELOPE_SUFFIX = b'}'
+
     def __init__(self, config: dict):
         # Настройки сервера
         self.host = config.get('WS_SERVER_HOST', '0.0.0.0')
         self.port = int(config.get('WS_SERVER_PORT', 25370))
         self.auth_token = config.get('WS_AUTH_TOKEN')  # Хешированный токен
+        self._auth_token_bytes = bytes.fromhex(self.auth_token)  # Digest для сравнения
 
         # Настройки БД
         self.db_config = {
@@ -70,6 +103,11 @@ class HighScoreSignalWebSocketServer:
         self.notify_channel = config.get('NOTIFY_CHANNEL', 'new_signals')
         self.lightweight_check_interval = int(config.get('LIGHTWEIGHT_CHECK_INTERVAL', 1))
         self.notify_fallback_interval = int(config.get('NOTIFY_FALLBACK_INTERVAL', 60))
+        self.notify_debounce_ms = int(config.get('NOTIFY_DEBOUNCE_MS', 10))
+
+        # Broadcast: таймаут отправки одному клиенту (медленные отключаются)
+        self.send_timeout = float(config.get('SEND_TIMEOUT', 0.5))
+        self._send_semaphore = asyncio.Semaphore(self.BROADCAST_CONCURRENCY)
 
         # Параметры по умолчанию для high-score сигналов
         self.default_params = {
@@ -82,29 +120,58 @@ class HighScoreSignalWebSocketServer:
             'trailing_distance_filter': 1.0
         }
 
+        # Фильтры паттернов (передаются в запрос как массивы)
+        self.required_patterns = ['SQUEEZE_IGNITION', 'OI_EXPLOSION']
+        self.required_timeframes = ['15m', '1h', '4h']
+
         # Состояние NOTIFY
         self.notify_available = False
         self.notify_connection: Optional[asyncpg.Connection] = None
+        # Пачка NOTIFY схлопывается в один запрос (debounce + single-flight)
+        self._notify_event = asyncio.Event()
+        self._notify_closed = asyncio.Event()
+        self._fetch_lock = asyncio.Lock()
 
         # Отслеживание изменений для lightweight проверок
         self.last_max_id = 0
-        self.last_check_timestamp = None
 
         # Управление подключениями
-        self.connected_clients: Set = set()
-        self.authenticated_clients: Set = set()
-        self.client_info: Dict = {}
+        # clients - все подключения, authenticated_clients - список для broadcast
+        self.clients: Dict = {}
+        self.authenticated_clients: List = []
+        # Фоновые close() медленных клиентов: ссылки держатся до завершения,
+        # иначе задачу может собрать GC
+        self._close_tasks: set = set()
 
         # Состояние
         self.db_pool: Optional[asyncpg.Pool] = None
         self.running = False
-        self.last_signals: List[dict] = []
+        # Последние сигналы по id (порядок вставки = порядок запроса)
+        self._signal_map: Dict[int, dict] = {}
+        # Закодированное сообщение с _signal_map (переиспользуется для
+        # broadcast, get_signals и отправки после аутентификации)
+        self._last_payload_bytes: Optional[bytes] = None
+        self._last_payload_version = 0
         self.stats = {
             'queries_executed': 0,
             'signals_sent': 0,
             'errors': 0,
+            'slow_client_drops': 0,
             'start_time': datetime.now()
         }
+        # Монотонное время старта для расчета uptime
+        self._start_monotonic = time.monotonic()
+
+        # Обработчики сообщений клиента по типу
+        self._handlers = {
+            'auth': self.handle_auth,
+            'ping': self._handle_ping,
+            'get_stats': self._handle_get_stats,
+            'get_signals': self._send_last_signals
+        }
+
+        # SQL запрос не меняется во время работы - формируем один раз
+        self.signal_query = self.build_signal_query()
 
         logger.info(f"High-Score Signal WebSocket Server initialized on {self.host}:{self.port}")
         logger.info(f"Hybrid mode: NOTIFY={'enabled' if self.use_notify else 'disabled'}, "
@@ -112,14 +179,27 @@ class HighScoreSignalWebSocketServer:
         logger.info(f"Filters: total_score > 250, patterns=[SQUEEZE_IGNITION, OI_EXPLOSION], "
                    f"timeframes=[15m, 1h, 4h]")
 
-    def hash_token(self, token: str) -> str:
-        """Хеширование токена для безопасного сравнения"""
-        return hashlib.sha256(token.encode()).hexdigest()
+    def hash_token(self, token: str) -> bytes:
+        """Хеширование токена для безопасного сравнения (сырой SHA-256 digest)"""
+        return hashlib.sha256(token.encode()).digest()
+
+    async def hash_token_async(self, token: str) -> bytes:
+        """
+        Хеширование токена без блокировки event loop
+        hashlib отпускает GIL только для данных > 2 KB, поэтому короткие
+        токены хешируются на месте
+        """
+        if len(token) > self.HASH_IN_THREAD_THRESHOLD:
+            return await asyncio.to_thread(self.hash_token, token)
+        return self.hash_token(token)
 
     def build_signal_query(self) -> str:
         """
         Формирует SQL запрос для высококачественных сигналов
-        Возвращает запрос с placeholder для signal_window_minutes
+        Возвращает параметризованный запрос: $1 - signal_window_minutes,
+        $2 - required_patterns, $3 - required_timeframes
+        (постоянный текст запроса позволяет asyncpg переиспользовать
+        prepared statement на каждом соединении пула)
         """
         query = """
 -- Запрос высококачественных сигналов с паттернами SQUEEZE_IGNITION и OI_EXPLOSION
@@ -134,46 +214,31 @@ SELECT
     sh.created_at,
     tp.exchange_id,
     tp.contract_type_id,
-    
-    -- Собираем информацию о паттернах
-    array_agg(DISTINCT sp.pattern_type) FILTER (WHERE sp.pattern_type IS NOT NULL) as patterns,
-    array_agg(DISTINCT sp.timeframe) FILTER (WHERE sp.timeframe IS NOT NULL) as timeframes
-    
+    pats.patterns,
+    pats.timeframes
+
 FROM fas_v2.scoring_history sh
 JOIN public.trading_pairs tp ON sh.trading_pair_id = tp.id
--- Добавляем JOIN для получения паттернов
-LEFT JOIN fas_v2.sh_patterns shp ON shp.scoring_history_id = sh.id
-LEFT JOIN fas_v2.signal_patterns sp ON shp.signal_patterns_id = sp.id
-    AND sp.pattern_type IN ('SQUEEZE_IGNITION', 'OI_EXPLOSION')
-    AND sp.timeframe IN ('15m', '1h', '4h')
+-- Паттерны собираются одним проходом по sh_patterns на сигнал
+LEFT JOIN LATERAL (
+    SELECT
+        array_agg(DISTINCT sp.pattern_type) as patterns,
+        array_agg(DISTINCT sp.timeframe) as timeframes
+    FROM fas_v2.sh_patterns shp
+    JOIN fas_v2.signal_patterns sp ON shp.signal_patterns_id = sp.id
+    WHERE shp.scoring_history_id = sh.id
+        AND sp.pattern_type = ANY($2::text[])
+        AND sp.timeframe = ANY($3::text[])
+) pats ON TRUE
 
 WHERE sh.total_score > 250
     AND tp.contract_type_id = 1
     AND tp.exchange_id = 1
     AND tp.is_active = TRUE
     AND sh.is_active = TRUE
-    AND sh.timestamp >= now() - INTERVAL '%s minutes'
+    AND sh.timestamp >= now() - make_interval(mins => $1)
     -- Проверяем что есть хотя бы один нужный паттерн
-    AND EXISTS (
-        SELECT 1
-        FROM fas_v2.sh_patterns shp2
-        JOIN fas_v2.signal_patterns sp2 ON shp2.signal_patterns_id = sp2.id
-        WHERE shp2.scoring_history_id = sh.id
-            AND sp2.pattern_type IN ('SQUEEZE_IGNITION', 'OI_EXPLOSION')
-            AND sp2.timeframe IN ('15m', '1h', '4h')
-    )
-
-GROUP BY
-    sh.id,
-    sh.trading_pair_id,
-    tp.pair_symbol,
-    sh.total_score,
-    sh.score_week,
-    sh.score_month,
-    sh.timestamp,
-    sh.created_at,
-    tp.exchange_id,
-    tp.contract_type_id
+    AND pats.patterns IS NOT NULL
 
 ORDER BY 
     sh.total_score DESC,
@@ -188,7 +253,8 @@ ORDER BY
                 **self.db_config,
                 min_size=2,
                 max_size=10,
-                command_timeout=60
+                command_timeout=60,
+                init=self.init_connection
             )
             logger.info("Database pool created successfully")
 
@@ -202,6 +268,16 @@ ORDER BY
             logger.error(f"Failed to initialize database: {e}")
             raise
 
+    async def init_connection(self, conn: asyncpg.Connection):
+        """Настройка нового соединения пула: numeric декодируется сразу в float"""
+        await conn.set_type_codec(
+            'numeric',
+            encoder=str,
+            decoder=float,
+            schema='pg_catalog',
+            format='text'
+        )
+
     async def init_notify_listener(self):
         """
         Инициализация PostgreSQL LISTEN/NOTIFY
@@ -212,16 +288,7 @@ ORDER BY
             return False
 
         try:
-            # Создаем отдельное соединение для LISTEN
-            self.notify_connection = await asyncpg.connect(**self.db_config)
-
-            # Подписываемся на канал уведомлений
-            await self.notify_connection.add_listener(
-                self.notify_channel,
-                self.on_notify_received
-            )
-
-            self.notify_available = True
+            await self.connect_notify_listener()
             logger.info(f"✓ PostgreSQL NOTIFY listener active on channel '{self.notify_channel}'")
             logger.info(f"  Mode: Event-driven (real-time <10ms)")
             return True
@@ -232,71 +299,138 @@ ORDER BY
             self.notify_available = False
             return False
 
-    async def on_notify_received(self, connection, pid, channel, payload):
+    async def connect_notify_listener(self):
+        """Открывает соединение LISTEN и подписывается на канал уведомлений"""
+        # Создаем отдельное соединение для LISTEN
+        connection = await asyncpg.connect(**self.db_config)
+        self._notify_closed = asyncio.Event()
+        connection.add_termination_listener(lambda conn: self._notify_closed.set())
+
+        # Подписываемся на канал уведомлений
+        await connection.add_listener(
+            self.notify_channel,
+            self.on_notify_received
+        )
+
+        self.notify_connection = connection
+        self.notify_available = True
+
+    async def supervise_notify_listener(self):
+        """
+        Следит за соединением LISTEN и переподключается при обрыве
+        Пока соединения нет, notify_available = False и smart_query_loop
+        работает в polling режиме
+        """
+        backoff = 1
+
+        while self.running:
+            if self.notify_available:
+                try:
+                    await asyncio.wait_for(
+                        self._notify_closed.wait(),
+                        timeout=self.notify_fallback_interval
+                    )
+                except asyncio.TimeoutError:
+                    # Обрыв TCP без закрытия сокета termination listener не видит
+                    try:
+                        await self.notify_connection.execute("SELECT 1")
+                        continue
+                    except Exception as e:
+                        logger.warning(f"NOTIFY connection health check failed: {e}")
+
+                logger.warning("NOTIFY connection lost, falling back to polling mode")
+                self.notify_available = False
+                self.notify_connection.terminate()
+                backoff = 1
+
+            await asyncio.sleep(backoff)
+
+            try:
+                await self.connect_notify_listener()
+                logger.info(f"✓ PostgreSQL NOTIFY listener reconnected on channel '{self.notify_channel}'")
+                # За время обрыва могли пропустить уведомления
+                self._notify_event.set()
+            except Exception as e:
+                logger.warning(f"NOTIFY reconnect failed: {e}")
+                backoff = min(30, backoff * 2)
+
+    def on_notify_received(self, connection, pid, channel, payload):
         """
         Callback вызывается при получении NOTIFY от PostgreSQL
-        Обеспечивает мгновенную реакцию на новые сигналы (<10ms)
+        Не обращается к БД: только помечает событие для _notify_consumer,
+        который схлопывает пачку уведомлений в один запрос
         """
         try:
             # Парсим payload от триггера
             if payload:
-                data = json.loads(payload)
+                data = orjson.loads(payload)
                 logger.info(f"⚡ NOTIFY received: event={data.get('event')}, "
                           f"id={data.get('id')}, symbol={data.get('pair_symbol')}, "
                           f"total_score={data.get('total_score')}")
             else:
                 logger.info(f"⚡ NOTIFY received from PID {pid}")
 
-            # Выполняем полный запрос и broadcast
-            await self.do_full_query_and_broadcast()
-
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             logger.warning(f"Invalid JSON in NOTIFY payload: {payload[:100]}")
-            # Все равно делаем запрос
-            await self.do_full_query_and_broadcast()
         except Exception as e:
             logger.error(f"Error processing NOTIFY: {e}")
             self.stats['errors'] += 1
+        finally:
+            # Все равно делаем запрос
+            self._notify_event.set()
+
+    async def _notify_consumer(self):
+        """
+        Обработчик NOTIFY событий: ждет debounce окно, чтобы пачка вставок
+        дала один полный запрос и один broadcast вместо K
+        """
+        while self.running:
+            try:
+                await self._notify_event.wait()
+                self._notify_event.clear()
+                await asyncio.sleep(self.notify_debounce_ms / 1000)
+                await self.do_full_query_and_broadcast()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in NOTIFY consumer: {e}")
+                self.stats['errors'] += 1
 
     async def fetch_signals(self) -> List[dict]:
         """Получение высококачественных сигналов из БД"""
         try:
             async with self.db_pool.acquire() as conn:
-                # Формируем запрос
-                query = self.build_signal_query()
-
-                # Выполняем запрос
+                # Выполняем подготовленный запрос (кэш statements asyncpg)
                 rows = await conn.fetch(
-                    query % self.signal_window_minutes
+                    self.signal_query,
+                    self.signal_window_minutes,
+                    self.required_patterns,
+                    self.required_timeframes
                 )
 
-                # Преобразуем в словари
-                signals = []
-                for row in rows:
-                    signal = {
-                        'id': row['id'],
-                        'trading_pair_id': row['trading_pair_id'],
-                        'pair_symbol': row['pair_symbol'],
-                        'total_score': float(row['total_score']) if row['total_score'] else 0,
-                        'score_week': float(row['score_week']) if row['score_week'] else 0,
-                        'score_month': float(row['score_month']) if row['score_month'] else 0,
-                        'timestamp': row['timestamp'].isoformat() if row['timestamp'] else None,
-                        'created_at': row['created_at'].isoformat() if row['created_at'] else None,
-                        'exchange_id': row['exchange_id'],
-                        'contract_type_id': row['contract_type_id'],
-                        'patterns': row['patterns'] if row['patterns'] else [],
-                        'timeframes': row['timeframes'] if row['timeframes'] else [],
-                        
-                        # Добавляем параметры по умолчанию
-                        'recommended_action': self.default_params['recommended_action'],
-                        'score_week_filter': self.default_params['score_week_filter'],
-                        'score_month_filter': self.default_params['score_month_filter'],
-                        'max_trades_filter': self.default_params['max_trades_filter'],
-                        'stop_loss_filter': self.default_params['stop_loss_filter'],
-                        'trailing_activation_filter': self.default_params['trailing_activation_filter'],
-                        'trailing_distance_filter': self.default_params['trailing_distance_filter']
+                # Преобразуем в словари: numeric уже приходит как float
+                # (codec пула), параметры по умолчанию добавляются одним merge.
+                # Позиционный доступ к Record (порядок колонок SELECT) дешевле
+                # поиска по имени колонки
+                defaults = self.default_params
+                signals = [
+                    {
+                        'id': row[0],
+                        'trading_pair_id': row[1],
+                        'pair_symbol': row[2],
+                        'total_score': row[3] or 0,
+                        'score_week': row[4] or 0,
+                        'score_month': row[5] or 0,
+                        'timestamp': row[6],
+                        'created_at': row[7],
+                        'exchange_id': row[8],
+                        'contract_type_id': row[9],
+                        'patterns': row[10] or [],
+                        'timeframes': row[11] or [],
+                        **defaults
                     }
-                    signals.append(signal)
+                    for row in rows
+                ]
 
                 self.stats['queries_executed'] += 1
                 logger.debug(f"Fetched {len(signals)} high-score signals from database")
@@ -311,44 +445,29 @@ ORDER BY
     async def check_for_changes_lightweight(self) -> bool:
         """
         Легковесная проверка: появились ли новые высококачественные сигналы?
-        Запрос выполняется за ~1-2ms вместо ~50-100ms полного запроса
-        Проверяет только MAX(id) и MAX(timestamp)
+        Index-only проба по sh.id вместо сканирования окна (без JOIN и COUNT)
+        Ложные срабатывания стоят лишь одного лишнего полного запроса,
+        который применяет все фильтры
         """
         try:
             async with self.db_pool.acquire() as conn:
                 result = await conn.fetchrow("""
-                    SELECT
-                        MAX(sh.id) as max_id,
-                        MAX(sh.timestamp) as max_timestamp,
-                        COUNT(*) as total_count
-                    FROM fas_v2.scoring_history sh
-                    JOIN public.trading_pairs tp ON sh.trading_pair_id = tp.id
-                    WHERE sh.timestamp >= now() - INTERVAL '%s minutes'
-                        AND sh.is_active = true
-                        AND tp.is_active = true
-                        AND sh.total_score > 250
-                        AND tp.contract_type_id = 1
-                        AND tp.exchange_id = 1
-                """ % self.signal_window_minutes)
-
-                if not result or not result['max_id']:
+                    SELECT id
+                    FROM fas_v2.scoring_history
+                    WHERE id > $1
+                        AND is_active
+                        AND total_score > 250
+                    ORDER BY id DESC
+                    LIMIT 1
+                """, self.last_max_id)
+
+                if not result:
                     return False
 
-                max_id = result['max_id']
-                max_ts = result['max_timestamp']
-
-                # Проверяем изменения
-                has_changes = (
-                    max_id > self.last_max_id or
-                    (max_ts and max_ts != self.last_check_timestamp)
-                )
-
-                if has_changes:
-                    self.last_max_id = max_id
-                    self.last_check_timestamp = max_ts
-                    logger.debug(f"Changes detected: max_id={max_id}, count={result['total_count']}")
+                self.last_max_id = result['id']
+                logger.debug(f"Changes detected: max_id={self.last_max_id}")
 
-                return has_changes
+                return True
 
         except Exception as e:
             logger.error(f"Error in lightweight check: {e}")
@@ -359,10 +478,18 @@ ORDER BY
         Выполняет полный запрос сигналов и рассылку всем клиентам
         Используется как при NOTIFY, так и при обнаружении изменений в polling mode
         """
+        async with self._fetch_lock:
+            await self._do_full_query_and_broadcast()
+
+    async def _do_full_query_and_broadcast(self):
+        """Тело do_full_query_and_broadcast (вызывается под _fetch_lock)"""
         try:
             signals = await self.fetch_signals()
-            self.last_signals = signals
-            await self.broadcast_signals(signals)
+            if not await self.set_last_signals(signals):
+                logger.debug("Signal set unchanged, broadcast skipped")
+                return
+
+            await self.broadcast_signals(self._last_payload_bytes)
 
             logger.info(f"📡 Broadcast {len(signals)} high-score signals to {len(self.authenticated_clients)} clients")
             
@@ -378,59 +505,114 @@ ORDER BY
             logger.error(f"Error in full query and broadcast: {e}")
             self.stats['errors'] += 1
 
-    async def broadcast_signals(self, signals: List[dict]):
-        """Отправка сигналов всем аутентифицированным клиентам"""
+    async def set_last_signals(self, signals: List[dict]) -> bool:
+        """
+        Сохраняет последние сигналы и кодирует сообщение для них один раз
+        Кэш инвалидируется только если набор сигналов изменился
+        Возвращает True, если есть изменения (нужен broadcast)
+        """
+        signal_map = {signal['id']: signal for signal in signals}
+        if self._last_payload_bytes is not None and signal_map == self._signal_map:
+            return False
+
+        added = signal_map.keys() - self._signal_map.keys()
+        removed = self._signal_map.keys() - signal_map.keys()
+        logger.debug(f"Signal delta: +{len(added)} -{len(removed)}")
+
+        self._signal_map = signal_map
+        self._last_payload_version += 1
+        # Большой снимок кодируем в потоке, чтобы не блокировать event loop
+        if len(signals) > self.ENCODE_IN_THREAD_THRESHOLD:
+            data_json = await asyncio.to_thread(orjson.dumps, signals)
+        else:
+            data_json = orjson.dumps(signals)
+
+        # Оболочка сообщения фиксирована: склеиваем готовые фрагменты
+        # вместо кодирования словаря целиком
+        self._last_payload_bytes = b''.join((
+            self.ENVELOPE_PREFIX,
+            orjson.dumps(datetime.now()),
+            self.ENVELOPE_COUNT,
+            str(len(signals)).encode(),
+            self.ENVELOPE_DATA,
+            data_json,
+            self.ENVELOPE_SUFFIX
+        ))
+        return True
+
+    async def broadcast_signals(self, payload: bytes):
+        """Отправка закодированного сообщения всем аутентифицированным клиентам"""
         if not self.authenticated_clients:
             return
 
-        # Подготовка сообщения
-        message = json.dumps({
-            'type': 'signals',
-            'timestamp': datetime.now().isoformat(),
-            'count': len(signals),
-            'data': signals
-        })
+        # Параллельная отправка всем аутентифицированным клиентам:
+        # медленный клиент не задерживает остальных
+        clients = self.authenticated_clients[:]
+        results = await asyncio.gather(
+            *(self.send_with_timeout(client, payload) for client in clients),
+            return_exceptions=True
+        )
 
-        # Отправка всем аутентифицированным клиентам
         disconnected = set()
 
-        for client in self.authenticated_clients:
-            try:
-                await client.send(message)
-                self.stats['signals_sent'] += 1
-            except websockets.exceptions.ConnectionClosed:
+        for client, result in zip(clients, results):
+            if isinstance(result, websockets.exceptions.ConnectionClosed):
                 disconnected.add(client)
-            except Exception as e:
-                logger.error(f"Error sending to client: {e}")
+            elif isinstance(result, asyncio.TimeoutError):
+                # Устаревший сигнал хуже пропущенного: отключаем медленного клиента
+                state = self.clients.get(client)
+                logger.warning(f"Dropping slow consumer {state.ip if state else 'unknown'}")
+                self.stats['slow_client_drops'] += 1
+                disconnected.add(client)
+                self.close_in_background(client, 1013, 'Slow consumer')
+            elif isinstance(result, Exception):
+                logger.error(f"Error sending to client: {result}")
                 disconnected.add(client)
 
+        self.stats['signals_sent'] += sum(
+            1 for result in results if not isinstance(result, BaseException)
+        )
+
         # Удаление отключенных клиентов
         for client in disconnected:
             await self.disconnect_client(client)
 
+    async def send_with_timeout(self, websocket, payload: bytes):
+        """Отправка одному клиенту с таймаутом и ограничением параллелизма"""
+        async with self._send_semaphore:
+            await asyncio.wait_for(websocket.send(payload), timeout=self.send_timeout)
+
     async def handle_client(self, websocket):
         """Обработка подключения клиента"""
         # Регистрация клиента
-        self.connected_clients.add(websocket)
         client_ip = websocket.remote_address[0] if websocket.remote_address else 'unknown'
-
-        self.client_info[websocket] = {
-            'ip': client_ip,
-            'connected_at': datetime.now(),
-            'authenticated': False
-        }
+        self.clients[websocket] = ClientState(ip=client_ip, connected_at=datetime.now())
 
         logger.info(f"New client connected from {client_ip}")
 
         try:
             # Отправляем запрос аутентификации
-            await websocket.send(json.dumps({
+            await websocket.send(orjson.dumps({
                 'type': 'auth_required',
                 'message': 'Please authenticate with your token'
             }))
 
-            # Ждем аутентификацию (30 секунд таймаут)
-            auth_task = asyncio.create_task(self.wait_for_auth(websocket))
+            # Первое сообщение должно быть аутентификацией (30 секунд таймаут)
+            try:
+                message = await asyncio.wait_for(websocket.recv(), timeout=30.0)
+            except asyncio.TimeoutError:
+                logger.warning(f"Client {client_ip} failed to authenticate in time")
+                await websocket.send(orjson.dumps({
+                    'type': 'error',
+                    'message': 'Authentication timeout'
+                }))
+                await websocket.close(code=4001, reason='Authentication timeout')
+                return
+
+            await self.handle_message(websocket, message)
+            if not self.is_authenticated(websocket):
+                await websocket.close(code=4001, reason='Authentication required')
+                return
 
             # Основной цикл обработки сообщений
             async for message in websocket:
@@ -442,68 +624,65 @@ ORDER BY
             logger.error(f"Error handling client {client_ip}: {e}")
         finally:
             await self.disconnect_client(websocket)
-            auth_task.cancel()
-
-    async def wait_for_auth(self, websocket):
-        """Ожидание аутентификации с таймаутом"""
-        await asyncio.sleep(30)
-
-        if websocket in self.connected_clients and websocket not in self.authenticated_clients:
-            logger.warning(f"Client {self.client_info[websocket]['ip']} failed to authenticate in time")
-            await websocket.send(json.dumps({
-                'type': 'error',
-                'message': 'Authentication timeout'
-            }))
-            await websocket.close()
 
     async def handle_message(self, websocket, message: str):
         """Обработка сообщения от клиента"""
         try:
-            data = json.loads(message)
+            # Проверка размера до разбора JSON
+            if len(message) > self.MAX_MESSAGE_SIZE:
+                logger.warning(f"Message too large from client: {len(message)} bytes")
+                await websocket.close(code=1009, reason='Message too big')
+                return
+
+            data = orjson.loads(message)
             msg_type = data.get('type')
 
-            if msg_type == 'auth':
-                await self.handle_auth(websocket, data)
-            elif msg_type == 'ping':
-                await websocket.send(json.dumps({'type': 'pong'}))
-            elif msg_type == 'get_stats':
-                await self.send_stats(websocket)
-            elif msg_type == 'get_signals':
-                # Немедленная отправка последних сигналов
-                if websocket in self.authenticated_clients:
-                    await websocket.send(json.dumps({
-                        'type': 'signals',
-                        'timestamp': datetime.now().isoformat(),
-                        'count': len(self.last_signals),
-                        'data': self.last_signals
-                    }))
+            handler = self._handlers.get(msg_type)
+            if handler:
+                await handler(websocket, data)
             else:
                 logger.warning(f"Unknown message type: {msg_type}")
 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             logger.error(f"Invalid JSON from client: {message[:100]}")
         except Exception as e:
             logger.error(f"Error handling message: {e}")
 
+    async def _handle_ping(self, websocket, data: dict):
+        """Ответ на ping"""
+        await websocket.send(orjson.dumps({'type': 'pong'}))
+
+    async def _handle_get_stats(self, websocket, data: dict):
+        """Запрос статистики сервера"""
+        await self.send_stats(websocket)
+
+    async def _send_last_signals(self, websocket, data: dict):
+        """Немедленная отправка последних сигналов"""
+        if self.is_authenticated(websocket) and self._last_payload_bytes:
+            await websocket.send(self._last_payload_bytes)
+
     async def handle_auth(self, websocket, data: dict):
         """Обработка аутентификации"""
         token = data.get('token')
 
         if not token:
-            await websocket.send(json.dumps({
+            await websocket.send(orjson.dumps({
                 'type': 'auth_failed',
                 'message': 'Token required'
             }))
             return
 
         # Проверка токена
-        if self.hash_token(token) == self.auth_token:
-            self.authenticated_clients.add(websocket)
-            self.client_info[websocket]['authenticated'] = True
+        # Сравнение за постоянное время (без timing-оракула)
+        if hmac.compare_digest(await self.hash_token_async(token), self._auth_token_bytes):
+            state = self.clients[websocket]
+            if not state.authenticated:
+                state.authenticated = True
+                self.authenticated_clients.append(websocket)
 
-            logger.info(f"Client {self.client_info[websocket]['ip']} authenticated successfully")
+            logger.info(f"Client {state.ip} authenticated successfully")
 
-            await websocket.send(json.dumps({
+            await websocket.send(orjson.dumps({
                 'type': 'auth_success',
                 'message': 'Authentication successful',
                 'query_interval': self.query_interval,
@@ -512,16 +691,11 @@ ORDER BY
             }))
 
             # Отправляем последние сигналы сразу после аутентификации
-            if self.last_signals:
-                await websocket.send(json.dumps({
-                    'type': 'signals',
-                    'timestamp': datetime.now().isoformat(),
-                    'count': len(self.last_signals),
-                    'data': self.last_signals
-                }))
+            if self._signal_map:
+                await websocket.send(self._last_payload_bytes)
         else:
-            logger.warning(f"Authentication failed for {self.client_info[websocket]['ip']}")
-            await websocket.send(json.dumps({
+            logger.warning(f"Authentication failed for {self.clients[websocket].ip}")
+            await websocket.send(orjson.dumps({
                 'type': 'auth_failed',
                 'message': 'Invalid token'
             }))
@@ -530,31 +704,51 @@ ORDER BY
 
     async def send_stats(self, websocket):
         """Отправка статистики сервера"""
-        if websocket not in self.authenticated_clients:
+        if not self.is_authenticated(websocket):
             return
 
-        uptime = (datetime.now() - self.stats['start_time']).total_seconds()
+        uptime = time.monotonic() - self._start_monotonic
 
-        await websocket.send(json.dumps({
+        await websocket.send(orjson.dumps({
             'type': 'stats',
             'uptime_seconds': uptime,
-            'connected_clients': len(self.connected_clients),
+            'connected_clients': len(self.clients),
             'authenticated_clients': len(self.authenticated_clients),
             'queries_executed': self.stats['queries_executed'],
             'signals_sent': self.stats['signals_sent'],
             'errors': self.stats['errors'],
-            'last_query': self.last_signals[0]['timestamp'] if self.last_signals else None,
+            'slow_client_drops': self.stats['slow_client_drops'],
+            'last_query': next(iter(self._signal_map.values()))['timestamp'] if self._signal_map else None,
             'default_params': self.default_params
         }))
 
+    def is_authenticated(self, websocket) -> bool:
+        """Проверка, прошел ли клиент аутентификацию"""
+        state = self.clients.get(websocket)
+        return state is not None and state.authenticated
+
+    def close_in_background(self, websocket, code: int, reason: str):
+        """Закрытие соединения без ожидания, с сохранением ссылки на задачу"""
+        task = asyncio.create_task(websocket.close(code=code, reason=reason))
+        self._close_tasks.add(task)
+        task.add_done_callback(self._on_close_done)
+
+    def _on_close_done(self, task: asyncio.Task):
+        """Снятие завершенной задачи close() и получение ее исключения"""
+        self._close_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Error closing slow client: {task.exception()}")
+
     async def disconnect_client(self, websocket):
         """Отключение клиента"""
-        self.connected_clients.discard(websocket)
-        self.authenticated_clients.discard(websocket)
+        state = self.clients.pop(websocket, None)
+        if state is None:
+            return
+
+        if state.authenticated:
+            self.authenticated_clients.remove(websocket)
 
-        if websocket in self.client_info:
-            logger.info(f"Client {self.client_info[websocket]['ip']} disconnected")
-            del self.client_info[websocket]
+        logger.info(f"Client {state.ip} disconnected")
 
     async def smart_query_loop(self):
         """
@@ -562,7 +756,7 @@ ORDER BY
         - Если NOTIFY доступен: fallback проверка раз в 60 сек (safety net)
         - Если NOTIFY недоступен: легковесные проверки каждую секунду
         """
-        last_full_query = datetime.now()
+        last_full_query = time.monotonic()
 
         while self.running:
             try:
@@ -575,7 +769,7 @@ ORDER BY
                     logger.debug("Fallback check (NOTIFY mode, safety net)")
                     if await self.check_for_changes_lightweight():
                         await self.do_full_query_and_broadcast()
-                        last_full_query = datetime.now()
+                        last_full_query = time.monotonic()
 
                 else:
                     # ===== POLLING MODE =====
@@ -583,12 +777,12 @@ ORDER BY
                     has_changes = await self.check_for_changes_lightweight()
 
                     # Принудительный полный запрос каждые N секунд (safety net)
-                    time_since_last = (datetime.now() - last_full_query).total_seconds()
+                    time_since_last = time.monotonic() - last_full_query
                     force_full_query = time_since_last >= self.query_interval
 
                     if has_changes or force_full_query:
                         await self.do_full_query_and_broadcast()
-                        last_full_query = datetime.now()
+                        last_full_query = time.monotonic()
                     else:
                         logger.debug("No changes detected, skipping full query")
 
@@ -613,8 +807,8 @@ ORDER BY
         await self.init_notify_listener()
 
         # Загрузка начальных сигналов
-        self.last_signals = await self.fetch_signals()
-        logger.info(f"✓ Initial high-score signals loaded: {len(self.last_signals)} signals")
+        await self.set_last_signals(await self.fetch_signals())
+        logger.info(f"✓ Initial high-score signals loaded: {len(self._signal_map)} signals")
 
         self.running = True
 
@@ -622,6 +816,7 @@ ORDER BY
         if self.notify_available:
             logger.info("🚀 Running in NOTIFY mode (event-driven)")
             logger.info(f"   - Latency: <10ms")
+            logger.info(f"   - Debounce: {self.notify_debounce_ms}ms")
             logger.info(f"   - Fallback check: every {self.notify_fallback_interval}s")
         else:
             logger.info("🚀 Running in POLLING mode (lightweight checks)")
@@ -633,16 +828,28 @@ ORDER BY
         for key, value in self.default_params.items():
             logger.info(f"   - {key}: {value}")
 
-        # Запуск умного цикла опроса
+        # Запуск умного цикла опроса и обработчика NOTIFY
         query_task = asyncio.create_task(self.smart_query_loop())
+        notify_task = asyncio.create_task(self._notify_consumer())
+        supervisor_task = (
+            asyncio.create_task(self.supervise_notify_listener())
+            if self.use_notify else None
+        )
 
         # Запуск WebSocket сервера
+        # compression=None: без permessage-deflate (экономия CPU и памяти
+        # на клиента при частых небольших broadcast), лимиты на размер и
+        # очередь не дают медленным клиентам копить память
         async with websockets.serve(
             self.handle_client,
             self.host,
             self.port,
+            compression=None,
             ping_interval=20,
-            ping_timeout=10
+            ping_timeout=10,
+            max_size=8192,
+            max_queue=32,
+            write_limit=2 ** 18
         ) as server:
             logger.info(f"✓ WebSocket Server listening on {self.host}:{self.port}")
             logger.info(f"✓ Signal window: {self.signal_window_minutes} minutes")
@@ -656,11 +863,14 @@ ORDER BY
             finally:
                 self.running = False
                 query_task.cancel()
+                notify_task.cancel()
+                if supervisor_task:
+                    supervisor_task.cancel()
 
                 # Закрываем все соединения
-                if self.connected_clients:
+                if self.clients:
                     await asyncio.gather(
-                        *[client.close() for client in self.connected_clients],
+                        *[client.close() for client in list(self.clients)],
                         return_exceptions=True
                     )
 
@@ -710,7 +920,11 @@ def main():
         'USE_NOTIFY': os.getenv('USE_NOTIFY', 'true'),
         'NOTIFY_CHANNEL': os.getenv('NOTIFY_CHANNEL', 'new_signals'),
         'LIGHTWEIGHT_CHECK_INTERVAL': os.getenv('LIGHTWEIGHT_CHECK_INTERVAL', '1'),
-        'NOTIFY_FALLBACK_INTERVAL': os.getenv('NOTIFY_FALLBACK_INTERVAL', '60')
+        'NOTIFY_FALLBACK_INTERVAL': os.getenv('NOTIFY_FALLBACK_INTERVAL', '60'),
+        'NOTIFY_DEBOUNCE_MS': os.getenv('NOTIFY_DEBOUNCE_MS', '10'),
+
+        # Broadcast
+        'SEND_TIMEOUT': os.getenv('SEND_TIMEOUT', '0.5')
     }
 
     # Создание и запуск сервера
@@ -724,6 +938,11 @@ def main():
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
+    # uvloop ускоряет сокетный I/O websockets и asyncpg
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Using uvloop event loop")
+
     try:
         asyncio.run(server.start())
     except KeyboardInterrupt:
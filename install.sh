@@ -16,6 +16,10 @@ if ! command -v python3 &> /dev/null; then
 fi
 
 PYTHON_VERSION=$(python3 --version | cut -d' ' -f2 | cut -d'.' -f1,2)
+if ! python3 -c 'import sys; sys.exit(sys.version_info < (3, 10))'; then
+    echo "❌ Python 3.10+ is required (found $PYTHON_VERSION)"
+    exit 1
+fi
 echo "✓ Python $PYTHON_VERSION found"
 echo ""
 
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Shared monitor implementation for Signal WebSocket Server
+Used by monitor.py and monitor2.py, which only override rendering
+and signal formatting
+"""
+
+import asyncio
+import collections
+import itertools
+import os
+import select
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import List, Optional
+import curses
+from signal_websocket_client import ConnectionState, SignalWebSocketClient
+
+
+class BaseSignalMonitor(ABC):
+    """Real-time monitoring dashboard for Signal WebSocket"""
+
+    TITLE = "Signal WebSocket Monitor"
+    FOOTER = "Press 'q' to quit, 'r' to request signals, 's' for stats"
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.client = SignalWebSocketClient(config)
+        self.running = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # Set in run_monitor
+
+        # Metrics
+        self.metrics = {
+            'connection_state': 'disconnected',
+            'signals_total': 0,
+            'signals_per_minute': collections.deque(maxlen=60),  # (minute, count) buckets
+            'last_signal_time': None,
+            'server_stats': {},
+            'recent_signals': collections.deque(maxlen=50),
+            'errors': collections.deque(maxlen=10)  # Last 10 errors
+        }
+        # Bucket of the minute currently being counted
+        self._current_minute = None
+        self._current_count = 0
+
+        # Set by callbacks, cleared by the dashboard after a redraw
+        self._dirty = True
+        self._last_activity = time.monotonic()
+
+        # Frame strings that only change with the terminal size
+        self._layout_dim = None
+
+        # Client counters, refreshed at most once a second by render()
+        self._cached_stats = None
+        self._stats_cached_at = 0.0
+
+        # Stats cadence runs only while connected and stops immediately.
+        # Created in run_monitor: the monitor is built before asyncio.run(),
+        # and an Event made here would belong to a different loop
+        self._connected_evt: Optional[asyncio.Event] = None
+        self._stop_evt: Optional[asyncio.Event] = None
+
+        # Setup callbacks
+        self.client.set_callbacks(
+            on_signals=self.on_signals,
+            on_connect=self.on_connect,
+            on_disconnect=self.on_disconnect,
+            on_error=self.on_error
+        )
+
+    async def on_signals(self, signals):
+        """Process received signals"""
+        self.metrics['signals_total'] += len(signals)
+        self.metrics['last_signal_time'] = time.monotonic()
+        self.mark_activity()
+
+        # Track signals per minute (deque keeps only the last 60 buckets)
+        minute = int(time.monotonic()) // 60
+        if minute == self._current_minute:
+            self._current_count += len(signals)
+        else:
+            if self._current_minute is not None:
+                self.metrics['signals_per_minute'].append((self._current_minute, self._current_count))
+            self._current_minute = minute
+            self._current_count = len(signals)
+
+        # Store recent signals (newest first, deque drops the oldest)
+        for signal in reversed(signals[:10]):
+            self.metrics['recent_signals'].appendleft(signal)
+
+    def signals_last_minute(self) -> float:
+        """Sliding 60s signal count: the current minute's bucket plus the
+        share of the previous bucket still inside the window"""
+        now = time.monotonic()
+        now_minute = int(now) // 60
+        buckets = {self._current_minute: self._current_count}
+        if self.metrics['signals_per_minute']:
+            minute, count = self.metrics['signals_per_minute'][-1]
+            buckets.setdefault(minute, count)
+        elapsed = (now % 60) / 60
+        return buckets.get(now_minute, 0) + buckets.get(now_minute - 1, 0) * (1 - elapsed)
+
+    def mark_activity(self):
+        """Flag the dashboard for redraw and switch it to fast input polling"""
+        self._dirty = True
+        self._last_activity = time.monotonic()
+
+    async def on_connect(self):
+        """Handle connection event"""
+        self.metrics['connection_state'] = 'connected'
+        self._connected_evt.set()
+        self.mark_activity()
+
+    async def on_disconnect(self):
+        """Handle disconnection event"""
+        self.metrics['connection_state'] = 'disconnected'
+        self._connected_evt.clear()
+        self.mark_activity()
+
+    async def on_error(self, error):
+        """Handle error event"""
+        self.metrics['errors'].append({
+            'time': datetime.now(),
+            'error': str(error)
+        })
+        self.mark_activity()
+
+    async def request_server_stats(self):
+        """Request stats from server every 30s while connected"""
+        while self.running:
+            # No timer wakeups while disconnected
+            await self._connected_evt.wait()
+
+            if self.client.state == ConnectionState.AUTHENTICATED:
+                await self.client.request_stats()
+
+            try:
+                await asyncio.wait_for(self._stop_evt.wait(), timeout=30)
+            except asyncio.TimeoutError:
+                pass
+
+    def init_colors(self):
+        """Set up color pairs and the text attributes built from them"""
+        curses.init_pair(1, curses.COLOR_GREEN, curses.COLOR_BLACK)
+        curses.init_pair(2, curses.COLOR_RED, curses.COLOR_BLACK)
+        curses.init_pair(3, curses.COLOR_YELLOW, curses.COLOR_BLACK)
+        curses.init_pair(4, curses.COLOR_CYAN, curses.COLOR_BLACK)
+
+        # Text attributes are fixed once the color pairs exist
+        self._attr_ok = curses.color_pair(1) | curses.A_BOLD
+        self._attr_warn = curses.color_pair(3)
+        self._attr_error = curses.color_pair(2)
+        self._attr_error_bold = curses.A_BOLD | curses.color_pair(2)
+
+    @staticmethod
+    def in_foreground() -> bool:
+        """True unless the terminal belongs to another process group (job in background)"""
+        try:
+            return os.tcgetpgrp(sys.stdout.fileno()) == os.getpgrp()
+        except (AttributeError, OSError):
+            return True
+
+    def draw_dashboard(self, stdscr):
+        """Draw the monitoring dashboard"""
+        curses.curs_set(0)  # Hide cursor
+        stdscr.nodelay(1)    # Non-blocking input
+        timeout_ms = 100     # 100ms after activity, 1s when idle
+
+        # Wait for input with select() where stdin is a real terminal;
+        # Windows consoles can't be selected, use the curses timeout there
+        use_select = sys.platform != 'win32' and os.isatty(0)
+        if not use_select:
+            stdscr.timeout(timeout_ms)
+
+        self.init_colors()
+
+        last_draw = 0.0
+        while self.running:
+            # Redraw only when a callback marked the metrics dirty, or once
+            # a second for time-based fields ("Ns ago", rate); nothing is
+            # drawn while the job is in the background
+            now = time.monotonic()
+            if (self._dirty or now - last_draw >= 1.0) and self.in_foreground():
+                self._dirty = False
+                last_draw = now
+                self.render(stdscr)
+
+            # Poll input fast only shortly after activity to save wakeups
+            idle_timeout = 100 if now - self._last_activity < 2.0 else 1000
+            if idle_timeout != timeout_ms:
+                timeout_ms = idle_timeout
+                if not use_select:
+                    stdscr.timeout(timeout_ms)
+
+            if use_select:
+                select.select([0], [], [], timeout_ms / 1000)
+
+            # Handle input (any key, including KEY_RESIZE, forces a redraw).
+            # After select() getch never blocks, it still picks up a pending resize
+            key = stdscr.getch()
+            if key != -1:
+                self.mark_activity()
+            if key == ord('q'):
+                self.running = False
+            elif key == ord('r'):
+                # This thread has no event loop: schedule on the monitor's loop
+                asyncio.run_coroutine_threadsafe(self.client.request_signals(), self._loop)
+            elif key == ord('s'):
+                asyncio.run_coroutine_threadsafe(self.client.request_stats(), self._loop)
+
+    def render(self, stdscr):
+        """Render one dashboard frame (curses only writes the changed cells)"""
+        stdscr.erase()
+        height, width = stdscr.getmaxyx()
+        if (height, width) != self._layout_dim:
+            self._layout_dim = (height, width)
+            self._title_col = (width - len(self.TITLE)) // 2
+            self._hline = "=" * width
+            self._footer = self.FOOTER[:width-1]
+
+        # Title
+        stdscr.addstr(0, self._title_col, self.TITLE, curses.A_BOLD)
+        stdscr.addstr(1, 0, self._hline)
+
+        # Connection status
+        row = 3
+        stdscr.addstr(row, 0, "Connection: ", curses.A_BOLD)
+
+        state = self.client.state.label
+        if state == 'authenticated':
+            stdscr.addstr(row, 12, f"● {state.upper()}", self._attr_ok)
+        elif state in ['connected', 'connecting']:
+            stdscr.addstr(row, 12, f"● {state.upper()}", self._attr_warn)
+        else:
+            stdscr.addstr(row, 12, f"● {state.upper()}", self._attr_error)
+
+        # Server URL
+        row += 1
+        stdscr.addstr(row, 0, f"Server: {self.config['SIGNAL_WS_URL']}")
+
+        # Statistics
+        row += 2
+        stdscr.addstr(row, 0, "Statistics:", curses.A_BOLD)
+        row += 1
+        stdscr.addstr(row, 2, f"Total Signals: {self.metrics['signals_total']:,}")
+
+        row += 1
+        if self.metrics['last_signal_time']:
+            time_ago = time.monotonic() - self.metrics['last_signal_time']
+            stdscr.addstr(row, 2, f"Last Signal: {time_ago:.0f}s ago")
+        else:
+            stdscr.addstr(row, 2, "Last Signal: Never")
+
+        # Calculate signals per minute
+        row += 1
+        if self._current_minute is not None:
+            stdscr.addstr(row, 2, f"Rate: {self.signals_last_minute():.0f} signals/min")
+
+        # Client stats (get_stats builds a new dict, don't call it every frame)
+        now = time.monotonic()
+        if self._cached_stats is None or now - self._stats_cached_at > 1.0:
+            self._cached_stats = self.client.get_stats()
+            self._stats_cached_at = now
+        client_stats = self._cached_stats
+        row += 1
+        stdscr.addstr(row, 2, f"Bytes Received: {client_stats['total_bytes_received']:,}")
+        row += 1
+        stdscr.addstr(row, 2, f"Reconnections: {client_stats['reconnections']}")
+
+        # Recent signals
+        row += 2
+        # Snapshot in one step: on_signals mutates the deque from the loop thread
+        recent = list(itertools.islice(self.metrics['recent_signals'], 5))
+        row = self.render_recent_signals(stdscr, recent, row, height, width)
+
+        # Errors (if any)
+        if self.metrics['errors'] and row < height - 3:
+            row += 1
+            stdscr.addstr(row, 0, "Recent Errors:", self._attr_error_bold)
+            row += 1
+            # Snapshot the newest 3, oldest first as before
+            last_errors = list(itertools.islice(reversed(self.metrics['errors']), 3))
+            for error in reversed(last_errors):
+                if row < height - 2:
+                    error_str = f"  {error['error'][:width-5]}"
+                    stdscr.addstr(row, 0, error_str, self._attr_error)
+                    row += 1
+
+        # Footer
+        stdscr.addstr(height - 1, 0, self._footer, curses.A_DIM)
+
+        stdscr.noutrefresh()
+        curses.doupdate()
+
+    @abstractmethod
+    def render_recent_signals(self, stdscr, signals: List[dict], row: int, height: int, width: int) -> int:
+        """Render the recent signals section, return the next free row"""
+
+    async def run_monitor(self, stdscr):
+        """Run the monitoring dashboard"""
+        self.running = True
+        self._connected_evt = asyncio.Event()
+        self._stop_evt = asyncio.Event()
+
+        # Start client
+        client_task = asyncio.create_task(self.client.run())
+        stats_task = asyncio.create_task(self.request_server_stats())
+
+        # Run dashboard in its own thread (keeps the default executor free)
+        self._loop = asyncio.get_running_loop()
+        dashboard_done = self._loop.create_future()
+
+        def dashboard_thread():
+            # Errors from drawing (e.g. curses.error on a tiny terminal) are
+            # re-raised in run_monitor, not lost in this thread
+            try:
+                self.draw_dashboard(stdscr)
+            except BaseException as e:
+                self._loop.call_soon_threadsafe(dashboard_done.set_exception, e)
+            else:
+                self._loop.call_soon_threadsafe(dashboard_done.set_result, None)
+
+        threading.Thread(target=dashboard_thread, name='dashboard', daemon=True).start()
+        try:
+            await dashboard_done
+        finally:
+            # Cleanup
+            self.running = False
+            self._stop_evt.set()
+            await self.client.stop()
+            client_task.cancel()
+            stats_task.cancel()  # Only matters if parked on the connected event
+
+    def start(self):
+        """Start the monitor with curses"""
+        try:
+            curses.wrapper(lambda stdscr: asyncio.run(self.run_monitor(stdscr)))
+        except KeyboardInterrupt:
+            print("\nMonitor stopped")
+
+
+class BaseSimpleMonitor(ABC):
+    """Simple text-based monitor (no curses)"""
+
+    # Seconds between status lines
+    STATUS_INTERVAL = 30
+
+    # Batches larger than this are formatted in a worker thread (asyncio.to_thread)
+    FORMAT_IN_THREAD_THRESHOLD = 50
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.client = SignalWebSocketClient(config)
+        self.running = False
+
+        self.stats = {
+            'signals_received': 0,
+            'last_signal': None,
+            'start_time': time.monotonic()
+        }
+
+        # Set by stop() to end the status loop without waiting out the
+        # interval; created in run(), on the loop that waits on it
+        self._stop_evt: Optional[asyncio.Event] = None
+
+    async def on_signals(self, signals):
+        """Process received signals"""
+        self.stats['signals_received'] += len(signals)
+        self.stats['last_signal'] = time.monotonic()
+
+        # Collect the whole block and write it once; large batches are
+        # formatted off the event loop so the client keeps receiving
+        if len(signals) > self.FORMAT_IN_THREAD_THRESHOLD:
+            text = await asyncio.to_thread(self.format_text, signals)
+        else:
+            text = self.format_text(signals)
+        if text:
+            sys.stdout.write(text)
+
+    def format_text(self, signals: List[dict]) -> str:
+        """Whole output block for a batch of signals (pure CPU, thread-safe)"""
+        lines = self.format_signals(signals)
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    @abstractmethod
+    def format_signals(self, signals: List[dict]) -> List[str]:
+        """Output lines for a batch of signals"""
+
+    def print_banner(self):
+        """Print the startup banner"""
+        print("Signal WebSocket Monitor (Simple Mode)")
+        print("=" * 50)
+        print(f"Server: {self.config['SIGNAL_WS_URL']}")
+        print("Press Ctrl+C to stop\n")
+
+    def print_status(self):
+        """Print periodic status"""
+        uptime = time.monotonic() - self.stats['start_time']
+        rate = self.stats['signals_received'] / uptime if uptime > 0 else 0
+
+        print(f"\n[Status] Uptime: {uptime:.0f}s, "
+              f"Signals: {self.stats['signals_received']}, "
+              f"Rate: {rate:.2f}/s, "
+              f"State: {self.client.state.label}")
+
+    async def run(self):
+        """Run simple monitor"""
+        self.print_banner()
+
+        self.client.set_callbacks(on_signals=self.on_signals)
+        self.running = True
+        self._stop_evt = asyncio.Event()
+
+        # Start client
+        client_task = asyncio.create_task(self.client.run())
+
+        # Monitor loop
+        try:
+            while self.running:
+                try:
+                    await asyncio.wait_for(self._stop_evt.wait(), timeout=self.STATUS_INTERVAL)
+                except asyncio.TimeoutError:
+                    self.print_status()
+        finally:
+            await self.client.stop()
+            client_task.cancel()
+
+    def stop(self):
+        """Stop the monitor loop immediately"""
+        self.running = False
+        if self._stop_evt is not None:
+            self._stop_evt.set()
@@ -13,6 +13,11 @@ from datetime import datetime
 import asyncpg
 from dotenv import load_dotenv
 
+try:
+    import uvloop  # Optional: faster event loop (not available on Windows)
+except ImportError:
+    uvloop = None
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -42,8 +47,7 @@ MIN_PNL = 180.0
 WINDOW_MINUTES = 2880  # 48 hours
 POLL_INTERVAL = 10
 
-# Use raw string for regex to avoid SyntaxWarning and escaping issues
-# We use .format() for MIN_PNL injection
+# We use .format() for MIN_PNL injection, the window is bound as $1
 QUERY_TEMPLATE = r"""
 WITH best_strategies AS (
     SELECT DISTINCT ON (strategy_name, signal_type, market_regime)
@@ -54,14 +58,9 @@ WITH best_strategies AS (
         ts_activation_pct,
         ts_callback_pct,
         total_pnl_pct,
-        string_to_array(
-            regexp_replace(
-                split_part(strategy_name, '|', 1),
-                '[\[\]'']', '', 'g'
-            ), ', '
-        ) as required_patterns
+        required_patterns  -- Stored column, see setup_best_signals_indexes.sql
     FROM optimization.best_parameters
-    WHERE total_pnl_pct > {min_pnl}
+    WHERE total_pnl_pct > {min_pnl}  -- Literal so bp_high_pnl_idx (partial) applies
     ORDER BY strategy_name, signal_type, market_regime, total_pnl_pct DESC
 ),
 recent_signals AS (
@@ -79,16 +78,24 @@ recent_signals AS (
     JOIN fas_v2.signal_patterns sp ON sp.id = shp.signal_patterns_id
     INNER JOIN public.trading_pairs tp ON tp.pair_symbol = sh.pair_symbol
     LEFT JOIN web.scoring_history_results_v2 shr ON shr.scoring_history_id = sh.id
-    LEFT JOIN fas_v2.market_regime mr ON (
-        mr.timeframe = '15m'
-        AND mr.timestamp <= sh.timestamp
-        AND mr.timestamp > sh.timestamp - INTERVAL '1 hour'
-    )
-    WHERE sh.timestamp >= NOW() - INTERVAL '%s minutes'
+    -- Latest 15m regime within the hour before the signal: one index
+    -- descent on market_regime (timeframe, timestamp DESC) per signal.
+    -- Inner join: signals without a regime are dropped before aggregation
+    JOIN LATERAL (
+        SELECT m.regime
+        FROM fas_v2.market_regime m
+        WHERE m.timeframe = '15m'
+            AND m.timestamp <= sh.timestamp
+            AND m.timestamp > sh.timestamp - INTERVAL '1 hour'
+        ORDER BY m.timestamp DESC
+        LIMIT 1
+    ) mr ON TRUE
+    WHERE sh.timestamp >= NOW() - make_interval(mins => $1)
         AND tp.exchange_id = 1
         AND tp.contract_type_id = 1
         AND tp.is_active = true
         AND shr.signal_type IS NOT NULL
+        AND mr.regime IS NOT NULL
     GROUP BY sh.id, sh.pair_symbol, sh.timestamp, sh.total_score, tp.exchange_id, shr.signal_type, mr.regime
     HAVING COUNT(DISTINCT sp.id) >= 2
 )
@@ -110,7 +117,6 @@ JOIN best_strategies bs ON (
     AND bs.market_regime = rs.market_regime
     AND rs.patterns @> bs.required_patterns
 )
-WHERE rs.market_regime IS NOT NULL
 ORDER BY rs.signal_id, bs.total_pnl_pct DESC
 """
 
@@ -126,26 +132,28 @@ async def monitor():
     print(f"{'TIME':<20} | {'SYMBOL':<10} | {'TYPE':<5} | {'PNL':<8} | {'PARAMS (SL/TS_ACT/TS_CB)'}")
     print("-" * 80)
 
+    # Every poll re-scans the whole window: a signal only qualifies once its
+    # signal_type, patterns and regime rows exist, which can happen after a
+    # later id has already qualified, so an id cursor would skip it
     seen_ids = set()
     first_run = True
 
     try:
         conn = await asyncpg.connect(**DB_CONFIG)
+        # Parsed and planned once per connection, not on every poll
+        stmt = await conn.prepare(QUERY)
         
         while True:
             try:
-                # Inject window minutes into the %s placeholder
-                rows = await conn.fetch(QUERY % WINDOW_MINUTES)
+                rows = await stmt.fetch(WINDOW_MINUTES)
+                window_ids = {r['signal_id'] for r in rows}
+                new_signals = [r for r in rows if r['signal_id'] not in seen_ids]
+                # Bounded by the window: ids older than WINDOW_MINUTES are no
+                # longer returned by the query, so they drop out of the set
+                seen_ids = window_ids
                 
                 # Sort by timestamp (oldest first for printing)
-                rows.sort(key=lambda x: x['signal_timestamp'])
-                
-                new_signals = []
-                for row in rows:
-                    sig_id = row['signal_id']
-                    if sig_id not in seen_ids:
-                        new_signals.append(row)
-                        seen_ids.add(sig_id)
+                new_signals.sort(key=lambda x: x['signal_timestamp'])
                 
                 if new_signals:
                     if first_run:
@@ -177,6 +185,7 @@ async def monitor():
                 # Reconnect if needed
                 if conn.is_closed():
                     conn = await asyncpg.connect(**DB_CONFIG)
+                    stmt = await conn.prepare(QUERY)
 
     except KeyboardInterrupt:
         print("\nStopping monitor...")
@@ -187,6 +196,8 @@ async def monitor():
             await conn.close()
 
 if __name__ == '__main__':
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     try:
         asyncio.run(monitor())
     except KeyboardInterrupt:
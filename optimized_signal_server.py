@@ -6,20 +6,28 @@ Includes optimized risk parameters (SL, TS)
 """
 
 import asyncio
-import json
 import logging
 import hashlib
+import hmac
 import secrets
+import zlib
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Set, Dict, Optional, List
+from typing import Dict, Optional, List
 import signal
 import sys
 import os
 
 import asyncpg
+import orjson
 import websockets
 from dotenv import load_dotenv
 
+try:
+    import uvloop  # Optional: faster event loop (not available on Windows)
+except ImportError:
+    uvloop = None
+
 # Load environment variables
 current_dir = os.path.dirname(os.path.abspath(__file__))
 env_path = os.path.join(os.path.dirname(current_dir), 'win_rate', '.env')
@@ -40,6 +48,22 @@ logging.basicConfig(
 logger = logging.getLogger('OptimizedSignalWS')
 
 
+def _f(value, default=0.0) -> float:
+    """float() for nullable numeric columns"""
+    return float(value) if value is not None else default
+
+
+@dataclass(slots=True)
+class ClientState:
+    """State of a connected client"""
+    ip: str
+    connected_at: datetime
+    out_queue: asyncio.Queue
+    writer: asyncio.Task
+    authenticated: bool = False
+    compression: bool = False
+
+
 class OptimizedSignalServer:
     """
     WebSocket server for streaming OPTIMIZED trading signals
@@ -47,11 +71,21 @@ class OptimizedSignalServer:
     Logic: Matches signals against strategies with total_pnl > 180%
     """
 
+    # Broadcasts waiting in a client's outgoing queue before it counts as
+    # a slow consumer and is disconnected
+    CLIENT_QUEUE_SIZE = 64
+
+    # Opt-in compressed broadcasts: clients that send "compression": "zlib"
+    # in their auth message get ZLIB_PREFIX + zlib-deflated JSON instead
+    ZLIB_PREFIX = b'\x01'
+    ZLIB_LEVEL = 1
+
     def __init__(self, config: dict):
         # Server settings
         self.host = config.get('WS_SERVER_HOST', '0.0.0.0')
         self.port = int(config.get('WS_SERVER_PORT', 25374))
         self.auth_token = config.get('WS_AUTH_TOKEN')
+        self._auth_token_bytes = bytes.fromhex(self.auth_token)  # Digest to compare against
 
         # Database settings
         self.db_config = {
@@ -76,19 +110,37 @@ class OptimizedSignalServer:
         # Notify state
         self.notify_available = False
         self.notify_connection: Optional[asyncpg.Connection] = None
+        # "Something changed" flag for the notify worker; a full queue means
+        # a query is already due, so bursts collapse into one
+        self._notify_events: asyncio.Queue = asyncio.Queue(maxsize=1)
 
         # Change tracking
         self.last_max_id = 0
+
+        # Single-flight full query: triggers arriving while one runs are
+        # collapsed into a single follow-up run
+        self._fetch_lock = asyncio.Lock()
+        self._fetch_pending = False
         
         # Client management
-        self.connected_clients: Set = set()
-        self.authenticated_clients: Set = set()
-        self.client_info: Dict = {}
+        # clients - every connection, authenticated_clients - list for broadcasts
+        self.clients: Dict = {}
+        self.authenticated_clients: List = []
+        # Background close() of dropped slow clients: referenced until done,
+        # otherwise the task may be garbage-collected
+        self._close_tasks: set = set()
 
         # State
         self.db_pool: Optional[asyncpg.Pool] = None
         self.running = False
         self.last_signals: List[dict] = []
+        # Same signals keyed by id, to detect an unchanged snapshot
+        self._last_snapshot_by_id: Dict[int, dict] = {}
+        # Snapshot message encoded once per change; the zlib variant is
+        # built on first use by a compression client
+        self._last_payload_bytes: bytes = b''
+        self._last_payload_zlib: Optional[bytes] = None
+        self._encode_snapshot()
         self.stats = {
             'queries_executed': 0,
             'signals_sent': 0,
@@ -96,16 +148,22 @@ class OptimizedSignalServer:
             'start_time': datetime.now()
         }
 
+        # min_strategy_pnl is fixed, so the query text is built once
+        self.signal_query = self.build_signal_query()
+
         logger.info(f"Optimized Signal Server initialized on {self.host}:{self.port}")
         logger.info(f"Strategy Filter: total_pnl > {self.min_strategy_pnl}%")
 
-    def hash_token(self, token: str) -> str:
-        return hashlib.sha256(token.encode()).hexdigest()
+    def hash_token(self, token: str) -> bytes:
+        """Raw SHA-256 digest of a client token"""
+        return hashlib.sha256(token.encode()).digest()
 
     def build_signal_query(self) -> str:
         """
         Constructs the complex SQL query to match signals with best strategies.
         Logic is identical to yesterday/1_select_yesterday_signals.py
+        The window is bound as $1, so the query text never changes and each
+        pool connection keeps it in asyncpg's prepared statement cache
         """
         query_template = r"""
         WITH best_strategies AS (
@@ -118,18 +176,11 @@ class OptimizedSignalServer:
                 ts_activation_pct,
                 ts_callback_pct,
                 total_pnl_pct,
-                -- Extract patterns array from strategy_name format: "['PAT1', 'PAT2']|TYPE|REGIME"
-                string_to_array(
-                    regexp_replace(
-                        split_part(strategy_name, '|', 1),  -- Get ['PAT1', 'PAT2'] part
-                        '[\[\]'']',  -- Remove brackets and quotes
-                        '',
-                        'g'
-                    ),
-                    ', '  -- Split by comma-space
-                ) as required_patterns
+                -- Patterns array parsed from strategy_name "['PAT1', 'PAT2']|TYPE|REGIME",
+                -- stored generated column (setup_best_signals_indexes.sql)
+                required_patterns
             FROM optimization.best_parameters
-            WHERE total_pnl_pct > {min_pnl}
+            WHERE total_pnl_pct > {min_pnl}  -- Literal, not $n: matches the bp_high_pnl_idx partial index
             ORDER BY
                 strategy_name,
                 signal_type,
@@ -149,8 +200,10 @@ class OptimizedSignalServer:
                 tp.id as trading_pair_id,
                 tp.exchange_id,
                 
-                -- Aggregate patterns
+                -- Aggregate patterns (combined for matching, split for clients)
                 ARRAY_AGG(DISTINCT sp.pattern_type || '_' || sp.timeframe) as patterns,
+                ARRAY_AGG(DISTINCT sp.pattern_type) as pattern_types,
+                ARRAY_AGG(DISTINCT sp.timeframe) as timeframes,
                 
                 -- Get market regime
                 mr.regime as market_regime
@@ -159,12 +212,14 @@ class OptimizedSignalServer:
             JOIN fas_v2.sh_patterns shp ON shp.scoring_history_id = sh.id
             JOIN fas_v2.signal_patterns sp ON sp.id = shp.signal_patterns_id
             INNER JOIN public.trading_pairs tp ON tp.pair_symbol = sh.pair_symbol
-            LEFT JOIN fas_v2.sh_regime shr_regime ON shr_regime.scoring_history_id = sh.id
-            LEFT JOIN fas_v2.market_regime mr ON mr.id = shr_regime.signal_regime_id
-            WHERE sh.timestamp >= NOW() - INTERVAL '%s minutes'
+            -- Inner joins: signals without a regime never reach the aggregation
+            JOIN fas_v2.sh_regime shr_regime ON shr_regime.scoring_history_id = sh.id
+            JOIN fas_v2.market_regime mr ON mr.id = shr_regime.signal_regime_id
+            WHERE sh.timestamp >= NOW() - make_interval(mins => $1)
                 AND tp.exchange_id = 1  -- Binance Futures Only
                 AND tp.contract_type_id = 1
                 AND tp.is_active = true
+                AND mr.regime IS NOT NULL
             GROUP BY sh.id, sh.pair_symbol, sh.timestamp, sh.total_score, sh.score_week, sh.score_month, sh.created_at, tp.id, tp.exchange_id, mr.regime
             HAVING COUNT(DISTINCT sp.id) >= 2  -- Multi-pattern only
         )
@@ -179,6 +234,8 @@ class OptimizedSignalServer:
             rs.market_regime,
             rs.trading_pair_id,
             rs.exchange_id,
+            rs.pattern_types,
+            rs.timeframes,
             
             -- Optimized Parameters
             bs.strategy_name,
@@ -193,7 +250,6 @@ class OptimizedSignalServer:
             bs.market_regime = rs.market_regime
             AND rs.patterns @> bs.required_patterns  -- EXACT pattern match
         )
-        WHERE rs.market_regime IS NOT NULL
         ORDER BY rs.signal_id, bs.total_pnl_pct DESC
         """
         return query_template.format(min_pnl=self.min_strategy_pnl)
@@ -201,11 +257,16 @@ class OptimizedSignalServer:
     async def init_db(self):
         """Initialize DB pool"""
         try:
+            # Fixed-size pool: the same few queries run every few seconds, so
+            # connections (and their prepared statement caches) stay warm;
+            # idle ones are recycled before server-side timeouts hit them
             self.db_pool = await asyncpg.create_pool(
                 **self.db_config,
-                min_size=2,
-                max_size=10,
-                command_timeout=60
+                min_size=4,
+                max_size=4,
+                statement_cache_size=256,
+                max_inactive_connection_lifetime=300,
+                command_timeout=30
             )
             logger.info("Database pool created successfully")
         except Exception as e:
@@ -231,53 +292,66 @@ class OptimizedSignalServer:
             self.notify_available = False
             return False
 
-    async def on_notify_received(self, connection, pid, channel, payload):
-        """Handle DB notification"""
+    def on_notify_received(self, connection, pid, channel, payload):
+        """Handle DB notification (only queues work, the query runs in _notify_worker)"""
+        if payload:
+            logger.info(f"⚡ NOTIFY received: {payload}")
         try:
-            if payload:
-                logger.info(f"⚡ NOTIFY received: {payload}")
-            await self.do_full_query_and_broadcast()
-        except Exception as e:
-            logger.error(f"Error processing NOTIFY: {e}")
+            self._notify_events.put_nowait(True)
+        except asyncio.QueueFull:
+            pass
+
+    async def _notify_worker(self):
+        """Run the full query for queued notifications"""
+        while True:
+            await self._notify_events.get()
+            try:
+                await self.do_full_query_and_broadcast()
+            except Exception as e:
+                logger.error(f"Error processing NOTIFY: {e}")
 
     async def fetch_signals(self) -> List[dict]:
         """Fetch optimized signals from DB"""
         try:
             async with self.db_pool.acquire() as conn:
-                query = self.build_signal_query()
-                rows = await conn.fetch(query % self.signal_window_minutes)
+                rows = await conn.fetch(self.signal_query, self.signal_window_minutes)
 
+                # Not NULL by construction of the query (joins and filters):
+                # signal_id, pair_symbol, signal_timestamp, trading_pair_id,
+                # exchange_id, market_regime, strategy_name, strategy_pnl
                 signals = []
                 for row in rows:
-                    signal = {
+                    score_week = _f(row['score_week'])
+                    score_month = _f(row['score_month'])
+                    signals.append({
                         'id': row['signal_id'],
-                        'trading_pair_id': row['trading_pair_id'] if row['trading_pair_id'] is not None else 'N/A',
-                        'pair_symbol': row['pair_symbol'] if row['pair_symbol'] is not None else '',
-                        'total_score': float(row['total_score']) if row['total_score'] else 0,
-                        'score_week': float(row['score_week']) if row['score_week'] is not None else 0.0,
-                        'score_month': float(row['score_month']) if row['score_month'] is not None else 0.0,
-                        'timestamp': row['signal_timestamp'].isoformat() if row['signal_timestamp'] else None,
-                        'created_at': row['created_at'].isoformat() if row['created_at'] else None,
-                        'exchange_id': row['exchange_id'] if row['exchange_id'] is not None else 'N/A',
+                        'trading_pair_id': row['trading_pair_id'],
+                        'pair_symbol': row['pair_symbol'],
+                        'total_score': _f(row['total_score'], 0),
+                        'score_week': score_week,
+                        'score_month': score_month,
+                        # datetime values are serialized by orjson (ISO 8601, same as isoformat())
+                        'timestamp': row['signal_timestamp'],
+                        'created_at': row['created_at'],
+                        'exchange_id': row['exchange_id'],
                         'contract_type_id': 1,  # Binance Futures
-                        'patterns': [],  # Can be added if needed
-                        'timeframes': [],  # Can be added if needed
+                        'patterns': row['pattern_types'],
+                        'timeframes': row['timeframes'],
                         
                         # Parameters in client format (matching high_score_signal_server)
-                        'recommended_action': row['strategy_signal_type'] if row['strategy_signal_type'] is not None else 'BUY',  # From best_parameters
-                        'score_week_filter': float(row['score_week']) if row['score_week'] is not None else 0.0,
-                        'score_month_filter': float(row['score_month']) if row['score_month'] is not None else 0.0,
+                        'recommended_action': row['strategy_signal_type'] or 'BUY',  # From best_parameters
+                        'score_week_filter': score_week,
+                        'score_month_filter': score_month,
                         'max_trades_filter': 10,
-                        'stop_loss_filter': float(row['sl_pct']) if row['sl_pct'] is not None else 0.0,
-                        'trailing_activation_filter': float(row['ts_activation_pct']) if row['ts_activation_pct'] is not None else 0.0,
-                        'trailing_distance_filter': float(row['ts_callback_pct']) if row['ts_callback_pct'] is not None else 0.0,
+                        'stop_loss_filter': _f(row['sl_pct']),
+                        'trailing_activation_filter': _f(row['ts_activation_pct']),
+                        'trailing_distance_filter': _f(row['ts_callback_pct']),
                         
                         # Additional fields for info
-                        'strategy_name': row['strategy_name'] if row['strategy_name'] is not None else '',
-                        'market_regime': row['market_regime'] if row['market_regime'] is not None else '',
-                        'strategy_pnl': float(row['strategy_pnl']) if row['strategy_pnl'] is not None else 0.0
-                    }
-                    signals.append(signal)
+                        'strategy_name': row['strategy_name'],
+                        'market_regime': row['market_regime'],
+                        'strategy_pnl': float(row['strategy_pnl'])
+                    })
 
                 self.stats['queries_executed'] += 1
                 logger.debug(f"Fetched {len(signals)} optimized signals")
@@ -292,16 +366,16 @@ class OptimizedSignalServer:
         """Lightweight check for new signals"""
         try:
             async with self.db_pool.acquire() as conn:
-                result = await conn.fetchrow("""
-                    SELECT MAX(id) as max_id
-                    FROM fas_v2.scoring_history
-                    WHERE timestamp >= NOW() - INTERVAL '%s minutes'
-                """ % self.signal_window_minutes)
-
-                if not result or not result['max_id']:
+                # id grows with timestamp: MAX(id) is a single probe of the
+                # rightmost primary key leaf, no timestamp range scan. The
+                # window itself is applied by the full query
+                max_id = await conn.fetchval(
+                    "SELECT MAX(id) FROM fas_v2.scoring_history"
+                )
+
+                if not max_id:
                     return False
 
-                max_id = result['max_id']
                 has_changes = max_id > self.last_max_id
                 
                 if has_changes:
@@ -314,60 +388,145 @@ class OptimizedSignalServer:
             return True
 
     async def do_full_query_and_broadcast(self):
-        """Execute full query and broadcast if signals found"""
+        """Execute full query and broadcast, coalescing overlapping calls"""
+        if self._fetch_lock.locked():
+            self._fetch_pending = True
+            return
+
+        async with self._fetch_lock:
+            await self._do_full_query_and_broadcast()
+            while self._fetch_pending:
+                self._fetch_pending = False
+                await self._do_full_query_and_broadcast()
+
+    def set_last_signals(self, signals: List[dict]) -> bool:
+        """
+        Store the latest snapshot
+        Returns False if it is identical to the previous one (no broadcast needed)
+        """
+        snapshot = {signal['id']: signal for signal in signals}
+        if snapshot == self._last_snapshot_by_id:
+            return False
+
+        added = snapshot.keys() - self._last_snapshot_by_id.keys()
+        removed = self._last_snapshot_by_id.keys() - snapshot.keys()
+        logger.debug(f"Signal delta: +{len(added)} -{len(removed)}")
+
+        self._last_snapshot_by_id = snapshot
+        self.last_signals = signals
+        self._encode_snapshot()
+        return True
+
+    def _encode_snapshot(self):
+        """Encode last_signals to bytes once, shared by every send"""
+        self._last_payload_bytes = orjson.dumps({
+            'type': 'signals',
+            'timestamp': datetime.now(),
+            'count': len(self.last_signals),
+            'data': self.last_signals
+        })
+        self._last_payload_zlib = None
+
+    def snapshot_payload(self, compression: bool) -> bytes:
+        """Encoded snapshot in the form the client negotiated"""
+        if not compression:
+            return self._last_payload_bytes
+        if self._last_payload_zlib is None:
+            self._last_payload_zlib = self.ZLIB_PREFIX + zlib.compress(
+                self._last_payload_bytes, self.ZLIB_LEVEL
+            )
+        return self._last_payload_zlib
+
+    async def _do_full_query_and_broadcast(self):
+        """Execute full query and broadcast if signals changed"""
         try:
             signals = await self.fetch_signals()
-            self.last_signals = signals
-            await self.broadcast_signals(signals)
+            if not self.set_last_signals(signals):
+                logger.debug("Signals unchanged, broadcast skipped")
+                return
+            await self.broadcast_signals()
             
             if signals:
                 logger.info(f"📡 Broadcast {len(signals)} optimized signals")
         except Exception as e:
             logger.error(f"Error in broadcast: {e}")
 
-    async def broadcast_signals(self, signals: List[dict]):
-        """Send signals to authenticated clients"""
+    async def broadcast_signals(self):
+        """Send the current snapshot to authenticated clients"""
         if not self.authenticated_clients:
             return
 
-        message = json.dumps({
-            'type': 'signals',
-            'timestamp': datetime.now().isoformat(),
-            'count': len(signals),
-            'data': signals
-        })
-
-        disconnected = set()
-        for client in self.authenticated_clients:
+        # Hand the pre-encoded payload to each client's writer task; the
+        # broadcast never waits on a socket, so a slow peer can't hold up
+        # the others
+        slow = []
+        for client in self.authenticated_clients[:]:
+            state = self.clients[client]
             try:
-                await client.send(message)
+                state.out_queue.put_nowait(self.snapshot_payload(state.compression))
                 self.stats['signals_sent'] += 1
-            except Exception:
-                disconnected.add(client)
+            except asyncio.QueueFull:
+                slow.append(client)
 
-        for client in disconnected:
-            await self.disconnect_client(client)
+        for client in slow:
+            await self.drop_slow_client(client)
+
+    async def send_snapshot(self, websocket):
+        """Queue the current snapshot for one client, same path as broadcasts"""
+        state = self.clients[websocket]
+        try:
+            state.out_queue.put_nowait(self.snapshot_payload(state.compression))
+        except asyncio.QueueFull:
+            await self.drop_slow_client(websocket)
+
+    async def drop_slow_client(self, websocket):
+        """Disconnect a client whose outgoing queue is full"""
+        logger.warning(f"Dropping slow consumer {self.clients[websocket].ip}")
+        await self.disconnect_client(websocket)
+        self.close_in_background(websocket, 1013, 'Slow consumer')
+
+    async def _writer_loop(self, websocket, queue: asyncio.Queue):
+        """Send queued broadcasts to one client in order"""
+        try:
+            while True:
+                message = await queue.get()
+                await websocket.send(message)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except Exception as e:
+            logger.error(f"Writer error: {e}")
 
     async def handle_client(self, websocket):
         """Handle new client connection"""
-        self.connected_clients.add(websocket)
         client_ip = websocket.remote_address[0] if websocket.remote_address else 'unknown'
         
-        self.client_info[websocket] = {
-            'ip': client_ip,
-            'connected_at': datetime.now(),
-            'authenticated': False
-        }
+        out_queue = asyncio.Queue(maxsize=self.CLIENT_QUEUE_SIZE)
+        self.clients[websocket] = ClientState(
+            ip=client_ip,
+            connected_at=datetime.now(),
+            out_queue=out_queue,
+            writer=asyncio.create_task(self._writer_loop(websocket, out_queue))
+        )
         
         logger.info(f"Client connected: {client_ip}")
 
         try:
-            await websocket.send(json.dumps({
+            await websocket.send(orjson.dumps({
                 'type': 'auth_required',
                 'message': 'Please authenticate'
             }))
 
-            auth_task = asyncio.create_task(self.wait_for_auth(websocket))
+            # First message must authenticate within 30s (no extra timer task)
+            try:
+                message = await asyncio.wait_for(websocket.recv(), timeout=30)
+            except asyncio.TimeoutError:
+                await websocket.close(code=4001, reason='Authentication timeout')
+                return
+
+            await self.handle_message(websocket, message)
+            if not self.is_authenticated(websocket):
+                await websocket.close(code=4001, reason='Authentication required')
+                return
 
             async for message in websocket:
                 await self.handle_message(websocket, message)
@@ -376,30 +535,20 @@ class OptimizedSignalServer:
             logger.error(f"Client error {client_ip}: {e}")
         finally:
             await self.disconnect_client(websocket)
-            auth_task.cancel()
-
-    async def wait_for_auth(self, websocket):
-        """Auth timeout"""
-        await asyncio.sleep(30)
-        if websocket in self.connected_clients and websocket not in self.authenticated_clients:
-            await websocket.close()
 
     async def handle_message(self, websocket, message: str):
         """Handle client message"""
         try:
-            data = json.loads(message)
+            data = orjson.loads(message)
             msg_type = data.get('type')
 
             if msg_type == 'auth':
                 await self.handle_auth(websocket, data)
             elif msg_type == 'ping':
-                await websocket.send(json.dumps({'type': 'pong'}))
+                await websocket.send(orjson.dumps({'type': 'pong'}))
             elif msg_type == 'get_signals':
-                if websocket in self.authenticated_clients:
-                    await websocket.send(json.dumps({
-                        'type': 'signals',
-                        'data': self.last_signals
-                    }))
+                if self.is_authenticated(websocket):
+                    await self.send_snapshot(websocket)
 
         except Exception as e:
             logger.error(f"Message error: {e}")
@@ -410,30 +559,55 @@ class OptimizedSignalServer:
         if not token:
             return
 
-        if self.hash_token(token) == self.auth_token:
-            self.authenticated_clients.add(websocket)
-            self.client_info[websocket]['authenticated'] = True
-            
-            await websocket.send(json.dumps({
+        # Constant-time compare, no hex conversion per attempt
+        if hmac.compare_digest(self.hash_token(token), self._auth_token_bytes):
+            state = self.clients[websocket]
+            if not state.authenticated:
+                state.authenticated = True
+                self.authenticated_clients.append(websocket)
+
+            auth_reply = {
                 'type': 'auth_success',
                 'server': 'OptimizedSignalServer',
                 'port': self.port
-            }))
+            }
+            if data.get('compression') == 'zlib':
+                state.compression = True
+                auth_reply['compression'] = 'zlib'
+
+            await websocket.send(orjson.dumps(auth_reply))
             
             if self.last_signals:
-                await websocket.send(json.dumps({
-                    'type': 'signals',
-                    'data': self.last_signals
-                }))
+                await self.send_snapshot(websocket)
         else:
             await websocket.close()
 
+    def is_authenticated(self, websocket) -> bool:
+        """Whether the client has passed authentication"""
+        state = self.clients.get(websocket)
+        return state is not None and state.authenticated
+
+    def close_in_background(self, websocket, code: int, reason: str):
+        """Close a connection without waiting, keeping a reference to the task"""
+        task = asyncio.create_task(websocket.close(code=code, reason=reason))
+        self._close_tasks.add(task)
+        task.add_done_callback(self._on_close_done)
+
+    def _on_close_done(self, task: asyncio.Task):
+        """Drop a finished close() task and retrieve its exception"""
+        self._close_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Error closing slow client: {task.exception()}")
+
     async def disconnect_client(self, websocket):
         """Disconnect client"""
-        self.connected_clients.discard(websocket)
-        self.authenticated_clients.discard(websocket)
-        if websocket in self.client_info:
-            del self.client_info[websocket]
+        state = self.clients.pop(websocket, None)
+        if state is None:
+            return
+
+        if state.authenticated:
+            self.authenticated_clients.remove(websocket)
+        state.writer.cancel()
 
     async def smart_query_loop(self):
         """Main query loop"""
@@ -458,19 +632,31 @@ class OptimizedSignalServer:
         await self.init_db()
         await self.init_notify_listener()
         
-        self.last_signals = await self.fetch_signals()
+        self.set_last_signals(await self.fetch_signals())
         logger.info(f"Initial signals: {len(self.last_signals)}")
         
         self.running = True
         query_task = asyncio.create_task(self.smart_query_loop())
-
-        async with websockets.serve(self.handle_client, self.host, self.port):
+        notify_task = asyncio.create_task(self._notify_worker())
+
+        # permessage-deflate off: broadcasts are compressed once, not per
+        # connection. Messages go out as orjson bytes (binary frames, no
+        # UTF-8 validation); clients parse them with the same json.loads.
+        # Incoming messages are small control messages, capped at 1 MiB
+        async with websockets.serve(
+            self.handle_client,
+            self.host,
+            self.port,
+            compression=None,
+            max_size=2**20
+        ):
             logger.info(f"Listening on port {self.port}")
             try:
                 await asyncio.Future()
             finally:
                 self.running = False
                 query_task.cancel()
+                notify_task.cancel()
                 if self.db_pool:
                     await self.db_pool.close()
 
@@ -492,6 +678,11 @@ def main():
     }
 
     server = OptimizedSignalServer(config)
+
+    # uvloop speeds up socket I/O for websockets and asyncpg
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Using uvloop event loop")
     
     try:
         asyncio.run(server.start())
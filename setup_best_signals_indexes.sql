@@ -0,0 +1,58 @@
+-- ============================================================================
+-- Indexes for the Best Strategies queries
+-- ============================================================================
+-- Used by optimized_signal_server.py and monitor_best_signals.py
+-- Safe to run more than once
+-- ============================================================================
+
+-- ============================================================================
+-- optimization.best_parameters.required_patterns
+-- ============================================================================
+-- Pattern list parsed from strategy_name ("['PAT1', 'PAT2']|TYPE|REGIME"),
+-- stored once per row instead of being recomputed with regexp_replace on
+-- every query. GIN index serves array containment (@> / <@) lookups.
+-- ============================================================================
+
+ALTER TABLE optimization.best_parameters
+    ADD COLUMN IF NOT EXISTS required_patterns text[]
+    GENERATED ALWAYS AS (
+        string_to_array(
+            regexp_replace(split_part(strategy_name, '|', 1), '[\[\]'']', '', 'g'),
+            ', '
+        )
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS bp_required_patterns_gin_idx
+    ON optimization.best_parameters USING GIN (required_patterns);
+
+-- ============================================================================
+-- best_strategies CTE: DISTINCT ON (strategy_name, signal_type, market_regime)
+-- ORDER BY ... total_pnl_pct DESC over rows above the PnL threshold
+-- ============================================================================
+-- Partial covering index: the threshold filter and the sort come from the
+-- index, the CTE runs as an index-only scan. The predicate uses 100 so it
+-- stays valid for any MIN_STRATEGY_PNL / MIN_PNL >= 100 (the queries put
+-- the threshold in as a literal, which lets the planner match it).
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS bp_high_pnl_idx
+    ON optimization.best_parameters (strategy_name, signal_type, market_regime, total_pnl_pct DESC)
+    INCLUDE (sl_pct, ts_activation_pct, ts_callback_pct, required_patterns)
+    WHERE total_pnl_pct > 100;
+
+-- ============================================================================
+-- fas_v2.market_regime: latest regime at or before a signal's timestamp
+-- ============================================================================
+-- monitor_best_signals.py looks it up with a LATERAL ... ORDER BY timestamp
+-- DESC LIMIT 1 subquery, served by a single descent of this index
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS mr_tf_ts_idx
+    ON fas_v2.market_regime (timeframe, timestamp DESC);
+
+-- ============================================================================
+-- Verification
+-- ============================================================================
+
+-- SELECT strategy_name, required_patterns FROM optimization.best_parameters LIMIT 5;
+-- \d optimization.best_parameters
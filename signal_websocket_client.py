@@ -5,24 +5,69 @@ WebSocket клиент для получения торговых сигнало
 """
 
 import asyncio
+import heapq
 import json
 import logging
+import random
+import time
 from datetime import datetime
 from typing import Optional, Callable, List, Dict
-from enum import Enum
+from enum import IntEnum
 
 import websockets
 
+try:
+    import orjson  # Быстрый JSON: принимает bytes, dumps возвращает bytes
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = json.loads
+    _dumps = json.dumps
+
+try:
+    import uvloop  # Опционально: быстрый event loop (нет под Windows)
+except ImportError:
+    uvloop = None
+
 logger = logging.getLogger('SignalWSClient')
 
+# Типы сообщений аутентификации (обрабатываются в authenticate())
+_AUTH_TYPES = frozenset({'auth_required', 'auth_success', 'auth_failed'})
+
+# Управляющие сообщения постоянны - сериализуются один раз при импорте
+_CONTROL_FRAMES = {
+    msg_type: _dumps({'type': msg_type})
+    for msg_type in ('get_signals', 'get_stats', 'ping')
+}
+
 
-class ConnectionState(Enum):
-    """Состояния подключения"""
-    DISCONNECTED = "disconnected"
-    CONNECTING = "connecting"
-    CONNECTED = "connected"
-    AUTHENTICATED = "authenticated"
-    RECONNECTING = "reconnecting"
+def install_uvloop() -> bool:
+    """
+    Включение uvloop для цикла чтения клиента, если он установлен
+    Вызывать до asyncio.run(): политику уже запущенного цикла не поменять
+    """
+    if uvloop is None:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
+class ConnectionState(IntEnum):
+    """Состояния подключения (IntEnum: сравнение как у int)"""
+    DISCONNECTED = 0
+    CONNECTING = 1
+    CONNECTED = 2
+    AUTHENTICATED = 3
+    RECONNECTING = 4
+
+    @property
+    def label(self) -> str:
+        """Строковое имя состояния для статистики и мониторов"""
+        return self.name.lower()
+
+
+# Состояния, в которых run() заново подключается
+_RECONNECT_STATES = frozenset({ConnectionState.DISCONNECTED, ConnectionState.RECONNECTING})
 
 
 class SignalWebSocketClient:
@@ -34,6 +79,8 @@ class SignalWebSocketClient:
         # Настройки подключения
         self.server_url = config.get('SIGNAL_WS_URL', 'ws://localhost:8765')
         self.auth_token = config.get('SIGNAL_WS_TOKEN')
+        # Токен не меняется - сообщение auth сериализуется один раз
+        self._auth_frame = _dumps({'type': 'auth', 'token': self.auth_token})
         self.auto_reconnect = config.get('AUTO_RECONNECT', True)
         self.reconnect_interval = int(config.get('RECONNECT_INTERVAL', 5))
         self.max_reconnect_attempts = int(config.get('MAX_RECONNECT_ATTEMPTS', -1))
@@ -50,18 +97,40 @@ class SignalWebSocketClient:
         self.running = False
         self.reconnect_attempts = 0
 
+        # Очередь управляющих сообщений (get_signals, get_stats, ping):
+        # отправляет одна задача-писатель, повторный запрос того же типа,
+        # пока предыдущий еще в очереди, не порождает лишний фрейм
+        self._send_q: asyncio.Queue = asyncio.Queue()
+        self._pending_control = set()
+        self._writer_task: Optional[asyncio.Task] = None
+
+        # Обработчики сообщений сервера по типу (один поиск в dict вместо
+        # цепочки сравнений строк на каждое сообщение)
+        self._dispatch = {
+            'signals': self.handle_signals,
+            'pong': self._on_pong,
+            'stats': self._on_stats,
+            'error': self._on_server_error,
+            # Сообщения аутентификации обрабатываются в authenticate()
+            **dict.fromkeys(_AUTH_TYPES, self._on_auth_message)
+        }
+
         # Буфер последних сигналов
         self.signal_buffer: List[dict] = []
         self.buffer_size = int(config.get('SIGNAL_BUFFER_SIZE', 100))
 
         # Статистика
         self.stats = {
-            'connected_at': None,
             'signals_received': 0,
-            'last_signal_time': None,
-            'reconnections': 0,
-            'total_bytes_received': 0
+            'reconnections': 0
         }
+        # Моменты событий - time.time() (float, без создания datetime
+        # на каждое сообщение), в datetime переводятся только в get_stats()
+        self._connected_at: Optional[float] = None
+        self._last_signal_at: Optional[float] = None
+        # Счетчик байт растет на каждом фрейме: отдельный int вместо записи
+        # в словарь stats, в get_stats() добавляется как total_bytes_received
+        self._bytes_received = 0
 
         logger.info(f"Signal WebSocket Client initialized for {self.server_url}")
 
@@ -82,14 +151,19 @@ class SignalWebSocketClient:
             self.state = ConnectionState.CONNECTING
             logger.info(f"Connecting to signal server: {self.server_url}")
 
+            # Без permessage-deflate: серверы шлют готовые orjson bytes,
+            # распаковка на каждом фрейме только тратит CPU.
+            # max_size с запасом под большой снимок сигналов
             self.websocket = await websockets.connect(
                 self.server_url,
                 ping_interval=20,
-                ping_timeout=10
+                ping_timeout=10,
+                compression=None,
+                max_size=2**22
             )
 
             self.state = ConnectionState.CONNECTED
-            self.stats['connected_at'] = datetime.now()
+            self._connected_at = time.time()
             self.reconnect_attempts = 0
 
             logger.info("Connected to signal server")
@@ -103,6 +177,7 @@ class SignalWebSocketClient:
 
             if success:
                 self.state = ConnectionState.AUTHENTICATED
+                self._start_writer()
 
             return success
 
@@ -123,18 +198,15 @@ class SignalWebSocketClient:
                 self.websocket.recv(),
                 timeout=5
             )
-            auth_req_data = json.loads(auth_req)
-            self.stats['total_bytes_received'] += len(auth_req)
+            auth_req_data = _loads(auth_req)
+            self._bytes_received += len(auth_req)
 
             if auth_req_data.get('type') != 'auth_required':
                 logger.error(f"Expected auth_required, got: {auth_req_data.get('type')}")
                 return False
 
             # Теперь отправляем токен
-            await self.websocket.send(json.dumps({
-                'type': 'auth',
-                'token': self.auth_token
-            }))
+            await self.websocket.send(self._auth_frame)
 
             # Ждем ответ
             response = await asyncio.wait_for(
@@ -142,8 +214,8 @@ class SignalWebSocketClient:
                 timeout=5
             )
 
-            data = json.loads(response)
-            self.stats['total_bytes_received'] += len(response)
+            data = _loads(response)
+            self._bytes_received += len(response)
 
             if data.get('type') == 'auth_success':
                 logger.info("Authentication successful")
@@ -161,40 +233,66 @@ class SignalWebSocketClient:
             logger.error(f"Authentication error: {e}")
             return False
 
-    async def handle_message(self, message: str):
-        """Обработка сообщения от сервера"""
-        try:
-            data = json.loads(message)
-            msg_type = data.get('type')
+    def _start_writer(self):
+        """Запуск задачи отправки управляющих сообщений для текущего соединения"""
+        if self._writer_task:
+            self._writer_task.cancel()
+        self._send_q = asyncio.Queue()
+        self._pending_control.clear()
+        self._writer_task = asyncio.create_task(self._writer_loop())
+
+    async def _writer_loop(self):
+        """Отправка управляющих сообщений из очереди"""
+        while True:
+            msg_type = await self._send_q.get()
+            self._pending_control.discard(msg_type)
+            try:
+                await self.websocket.send(_CONTROL_FRAMES[msg_type])
+            except Exception as e:
+                logger.error(f"Failed to send {msg_type}: {e}")
+                if msg_type == 'ping':
+                    self.state = ConnectionState.DISCONNECTED
 
-            if msg_type == 'signals':
-                # Обработка сигналов
-                await self.handle_signals(data)
+    def _queue_control(self, msg_type: str) -> bool:
+        """Постановка управляющего сообщения в очередь (дубликаты схлопываются)"""
+        if self.state != ConnectionState.AUTHENTICATED:
+            return False
+        if msg_type not in self._pending_control:
+            self._pending_control.add(msg_type)
+            self._send_q.put_nowait(msg_type)
+        return True
 
-            elif msg_type == 'pong':
-                # Ответ на ping
-                logger.debug("Received pong")
+    async def handle_message(self, message):
+        """Обработка сообщения от сервера (str или bytes)"""
+        try:
+            data = _loads(message)
+            await self._dispatch.get(data.get('type'), self._on_unknown)(data)
 
-            elif msg_type == 'stats':
-                # Статистика сервера
-                logger.info(f"Server stats: {data}")
+        except json.JSONDecodeError:  # orjson.JSONDecodeError - подкласс
+            logger.error(f"Invalid JSON: {message[:100]}")
+        except Exception as e:
+            logger.error(f"Error handling message: {e}")
 
-            elif msg_type == 'error':
-                logger.error(f"Server error: {data.get('message')}")
-                if self.on_error_callback:
-                    await self.on_error_callback(data.get('message'))
+    async def _on_pong(self, data: dict):
+        """Ответ на ping"""
+        logger.debug("Received pong")
 
-            elif msg_type in ['auth_required', 'auth_success', 'auth_failed']:
-                # Сообщения аутентификации - игнорируем, т.к. обрабатываются в authenticate()
-                logger.debug(f"Auth message: {msg_type}")
+    async def _on_stats(self, data: dict):
+        """Статистика сервера"""
+        logger.info(f"Server stats: {data}")
 
-            else:
-                logger.warning(f"Unknown message type: {msg_type}")
+    async def _on_server_error(self, data: dict):
+        """Ошибка на стороне сервера"""
+        logger.error(f"Server error: {data.get('message')}")
+        if self.on_error_callback:
+            await self.on_error_callback(data.get('message'))
 
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON: {message[:100]}")
-        except Exception as e:
-            logger.error(f"Error handling message: {e}")
+    async def _on_auth_message(self, data: dict):
+        """Сообщения аутентификации - игнорируем, т.к. обрабатываются в authenticate()"""
+
+    async def _on_unknown(self, data: dict):
+        """Неизвестный тип сообщения"""
+        logger.warning(f"Unknown message type: {data.get('type')}")
 
     async def handle_signals(self, data: dict):
         """Обработка полученных сигналов"""
@@ -205,11 +303,15 @@ class SignalWebSocketClient:
 
         # Обновляем статистику
         self.stats['signals_received'] += count
-        self.stats['last_signal_time'] = datetime.now()
+        self._last_signal_at = time.time()
 
         # Заменяем буфер новыми сигналами (сохраняем сортировку с сервера)
         # Сервер отправляет уже отсортированные данные - не нарушаем их порядок
-        self.signal_buffer = signals[-self.buffer_size:]
+        # Обычно снимок меньше буфера - тогда храним сам список без копии
+        if len(signals) > self.buffer_size:
+            self.signal_buffer = signals[-self.buffer_size:]
+        else:
+            self.signal_buffer = signals
 
         # Вызываем callback если установлен
         if self.on_signals_callback:
@@ -234,8 +336,10 @@ class SignalWebSocketClient:
 
         success = await self.connect()
         if not success and self.auto_reconnect:
-            # Увеличиваем интервал для следующей попытки
-            await asyncio.sleep(min(self.reconnect_interval * self.reconnect_attempts, 60))
+            # Экспоненциальная пауза (interval * 2^(n-1), не больше 60 сек)
+            # со случайным разбросом - клиенты не переподключаются хором
+            backoff = self.reconnect_interval * (1 << min(self.reconnect_attempts - 1, 6))
+            await asyncio.sleep(min(backoff * (0.5 + random.random()), 60))
 
         return success
 
@@ -246,7 +350,7 @@ class SignalWebSocketClient:
         while self.running:
             try:
                 # Подключаемся если не подключены
-                if self.state in [ConnectionState.DISCONNECTED, ConnectionState.RECONNECTING]:
+                if self.state in _RECONNECT_STATES:
                     success = await self.connect()
                     if not success:
                         if self.auto_reconnect:
@@ -255,10 +359,12 @@ class SignalWebSocketClient:
                             break
                         continue
 
-                # Читаем сообщения
+                # Читаем сообщения (метод связываем один раз, не на каждом фрейме)
+                handle = self.handle_message
                 async for message in self.websocket:
-                    self.stats['total_bytes_received'] += len(message)
-                    await self.handle_message(message)
+                    # Сервер шлет bytes (orjson) - len() без прохода по строке
+                    self._bytes_received += len(message)
+                    await handle(message)
 
             except websockets.exceptions.ConnectionClosed:
                 logger.warning("Connection closed")
@@ -286,52 +392,34 @@ class SignalWebSocketClient:
 
     async def request_signals(self):
         """Запрос немедленной отправки сигналов"""
-        if self.state == ConnectionState.AUTHENTICATED:
-            try:
-                await self.websocket.send(json.dumps({
-                    'type': 'get_signals'
-                }))
-                logger.debug("Requested immediate signals")
-                return True
-            except Exception as e:
-                logger.error(f"Failed to request signals: {e}")
-                return False
+        if self._queue_control('get_signals'):
+            logger.debug("Requested immediate signals")
+            return True
         return False
 
     async def request_stats(self):
         """Запрос статистики сервера"""
-        if self.state == ConnectionState.AUTHENTICATED:
-            try:
-                await self.websocket.send(json.dumps({
-                    'type': 'get_stats'
-                }))
-                logger.debug("Requested server stats")
-                return True
-            except Exception as e:
-                logger.error(f"Failed to request stats: {e}")
-                return False
+        if self._queue_control('get_stats'):
+            logger.debug("Requested server stats")
+            return True
         return False
 
     async def ping(self) -> bool:
         """Отправка ping для проверки соединения"""
-        if self.state == ConnectionState.AUTHENTICATED:
-            try:
-                await self.websocket.send(json.dumps({
-                    'type': 'ping'
-                }))
-                return True
-            except:
-                self.state = ConnectionState.DISCONNECTED
-                return False
-        return False
+        return self._queue_control('ping')
 
     def get_stats(self) -> dict:
         """Получение статистики клиента"""
+        connected_at = self._connected_at
+        last_signal_at = self._last_signal_at
         return {
-            'state': self.state.value,
+            'state': self.state.label,
+            'connected_at': datetime.fromtimestamp(connected_at) if connected_at else None,
+            'last_signal_time': datetime.fromtimestamp(last_signal_at) if last_signal_at else None,
             'reconnect_attempts': self.reconnect_attempts,
             'buffered_signals': len(self.signal_buffer),
-            **self.stats
+            **self.stats,
+            'total_bytes_received': self._bytes_received
         }
 
     def get_last_signals(self, limit: int = 10) -> List[dict]:
@@ -344,6 +432,9 @@ class SignalWebSocketClient:
         self.running = False
         self.auto_reconnect = False
 
+        if self._writer_task:
+            self._writer_task.cancel()
+
         if self.websocket:
             await self.websocket.close()
 
@@ -356,6 +447,10 @@ class SignalProcessor:
     Обработчик сигналов для интеграции в бота
     """
 
+    # Пакеты больше этого фильтруются в отдельном потоке (asyncio.to_thread);
+    # на маленьких накладные расходы потока дороже самой фильтрации
+    FILTER_IN_THREAD_THRESHOLD = 512
+
     def __init__(self, trading_bot):
         self.bot = trading_bot
         self.config = trading_bot.config
@@ -366,7 +461,14 @@ class SignalProcessor:
         # Фильтры сигналов
         self.min_score = float(self.config.get('MIN_SIGNAL_SCORE', 0.7))
         self.max_signals = int(self.config.get('MAX_SIGNALS_TO_PROCESS', 5))
-        self.allowed_exchanges = self.config.get('ALLOWED_EXCHANGES', '').split(',')
+        # frozenset: проверка биржи за O(1); None - фильтра нет ("1, 2" тоже
+        # допустимо). Числовые id хранятся и строкой, и int - exchange_id
+        # сигнала проверяется как есть, без str() на каждый сигнал
+        exchanges = [p.strip() for p in self.config.get('ALLOWED_EXCHANGES', '').split(',')]
+        exchanges = [p for p in exchanges if p]
+        self.allowed_exchanges = frozenset(
+            exchanges + [int(p) for p in exchanges if p.isdigit()]
+        ) if exchanges else None
 
         # Статистика обработки
         self.processing_stats = {
@@ -390,36 +492,46 @@ class SignalProcessor:
         self.processing_stats['total_received'] += len(signals)
 
         try:
-            # Фильтрация сигналов
-            filtered_signals = await self.filter_signals(signals)
-            self.processing_stats['filtered_out'] += (len(signals) - len(filtered_signals))
-
-            logger.info(f"Filtered to {len(filtered_signals)} signals")
+            # Фильтрация сигналов (сразу только max_signals лучших); большие
+            # пакеты - вне event loop, чтобы клиент продолжал читать сокет
+            if len(signals) > self.FILTER_IN_THREAD_THRESHOLD:
+                filtered_signals = await asyncio.to_thread(self.filter_signals, signals)
+            else:
+                filtered_signals = self.filter_signals(signals)
 
-            # Обработка топовых сигналов
-            for signal in filtered_signals[:self.max_signals]:
-                try:
-                    await self.bot.strategy.process_signal(signal)
-                    self.processing_stats['processed'] += 1
-                except Exception as e:
-                    logger.error(f"Error processing signal {signal.get('id')}: {e}")
-                    self.processing_stats['errors'] += 1
+            # Обработка топовых сигналов: независимы друг от друга, поэтому
+            # параллельно (их не больше max_signals - это и есть ограничение)
+            await asyncio.gather(*(self._process_one(signal) for signal in filtered_signals))
 
         except Exception as e:
             logger.error(f"Error in signal processing: {e}")
             self.processing_stats['errors'] += 1
 
-    async def filter_signals(self, signals: List[dict]) -> List[dict]:
-        """Фильтрация сигналов по критериям"""
+    async def _process_one(self, signal: dict):
+        """Передача одного сигнала в стратегию бота"""
+        try:
+            await self.bot.strategy.process_signal(signal)
+            self.processing_stats['processed'] += 1
+        except Exception as e:
+            logger.error(f"Error processing signal {signal.get('id')}: {e}")
+            self.processing_stats['errors'] += 1
+
+    def filter_signals(self, signals: List[dict]) -> List[dict]:
+        """
+        Фильтрация сигналов по критериям (только CPU, без await)
+        Возвращает не больше max_signals лучших по score_week
+        """
+        min_score = self.min_score
+        allowed = self.allowed_exchanges
         filtered = []
 
         for signal in signals:
             # Проверка score
-            if signal.get('score', 0) < self.min_score:
+            if signal.get('score', 0) < min_score:
                 continue
 
             # Проверка биржи (исправлен баг: exchange -> exchange_id)
-            if self.allowed_exchanges and str(signal.get('exchange_id')) not in self.allowed_exchanges:
+            if allowed is not None and signal.get('exchange_id') not in allowed:
                 continue
 
             # Дополнительные проверки
@@ -428,11 +540,14 @@ class SignalProcessor:
 
             filtered.append(signal)
 
-        # Сортировка по score_week (как на сервере)
-        # Сигналы уже приходят отсортированными с сервера, но пересортируем для надежности
-        filtered.sort(key=lambda x: x.get('score_week', 0), reverse=True)
+        self.processing_stats['filtered_out'] += len(signals) - len(filtered)
+        logger.info(f"Filtered to {len(filtered)} signals")
 
-        return filtered
+        # Порядок по score_week (как на сервере); нужны только max_signals
+        # лучших - nlargest за O(N log k) вместо полной сортировки
+        # (при равных score_week порядок сервера сохраняется, как у sort).
+        # Сигналы не изменяются: те же dict лежат в буфере клиента
+        return heapq.nlargest(self.max_signals, filtered, key=lambda s: s.get('score_week', 0))
 
     async def on_connect(self):
         """Обработчик подключения"""
@@ -450,7 +565,10 @@ class SignalProcessor:
         await self.bot.notify(f"Signal stream error: {error}")
 
     async def start(self):
-        """Запуск получения сигналов"""
+        """
+        Запуск получения сигналов
+        Для uvloop вызовите install_uvloop() до asyncio.run() в боте
+        """
         logger.info("Starting signal processor...")
         await self.client.run()
 
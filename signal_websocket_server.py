@@ -5,18 +5,26 @@ WebSocket сервер для трансляции торговых сигнал
 """
 
 import asyncio
-import json
 import logging
 import hashlib
+import hmac
 import secrets
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Set, Dict, Optional, List
 import signal
 import sys
+import time
 
 import asyncpg
+import orjson
 import websockets
 
+try:
+    import uvloop  # Опционально: быстрый event loop (нет под Windows)
+except ImportError:
+    uvloop = None
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -29,6 +37,14 @@ logging.basicConfig(
 logger = logging.getLogger('SignalWSServer')
 
 
+@dataclass(slots=True)
+class ClientState:
+    """Состояние подключенного клиента"""
+    ip: str
+    connected_at: datetime
+    authenticated: bool = False
+
+
 class SignalWebSocketServer:
     """
     WebSocket сервер для стриминга торговых сигналов
@@ -37,11 +53,15 @@ class SignalWebSocketServer:
     - Lightweight polling (fallback, 1 sec interval)
     """
 
+    # Клиентов в одном gather() при broadcast
+    BROADCAST_BATCH_SIZE = 50
+
     def __init__(self, config: dict):
         # Настройки сервера
         self.host = config.get('WS_SERVER_HOST', '0.0.0.0')
         self.port = int(config.get('WS_SERVER_PORT', 8765))
         self.auth_token = config.get('WS_AUTH_TOKEN')  # Хешированный токен
+        self._auth_token_bytes = bytes.fromhex(self.auth_token)  # Digest для сравнения
 
         # Настройки БД
         self.db_config = {
@@ -61,6 +81,7 @@ class SignalWebSocketServer:
         self.notify_channel = config.get('NOTIFY_CHANNEL', 'new_signals')
         self.lightweight_check_interval = int(config.get('LIGHTWEIGHT_CHECK_INTERVAL', 1))
         self.notify_fallback_interval = int(config.get('NOTIFY_FALLBACK_INTERVAL', 60))
+        self.notify_debounce_ms = int(config.get('NOTIFY_DEBOUNCE_MS', 10))
 
         # Управление биржами
         self.binance_enabled = config.get('BINANCE_ENABLED', 'true').lower() == 'true'
@@ -69,20 +90,37 @@ class SignalWebSocketServer:
         # Состояние NOTIFY
         self.notify_available = False
         self.notify_connection: Optional[asyncpg.Connection] = None
+        # Пачка NOTIFY схлопывается в один запрос (debounce + single-flight)
+        self._notify_event = asyncio.Event()
+        self._fetch_lock = asyncio.Lock()
 
         # Отслеживание изменений для lightweight проверок
         self.last_max_id = 0
-        self.last_check_timestamp = None
+        # Отдельное соединение для lightweight проверки (как у LISTEN):
+        # без acquire/release пула каждую секунду, запрос подготовлен один раз
+        self.lightweight_connection: Optional[asyncpg.Connection] = None
+        self._lightweight_stmt = None
 
         # Управление подключениями
-        self.connected_clients: Set = set()
+        # clients - все подключения (одна запись со всем состоянием клиента),
+        # authenticated_clients - набор для broadcast
+        self.clients: Dict = {}
         self.authenticated_clients: Set = set()
-        self.client_info: Dict = {}
 
         # Состояние
         self.db_pool: Optional[asyncpg.Pool] = None
         self.running = False
         self.last_signals: List[dict] = []
+        # Закодированное сообщение с last_signals (переиспользуется для
+        # broadcast, get_signals и отправки после аутентификации)
+        self._last_payload_bytes: Optional[bytes] = None
+        # id сигналов снимка: по ним и порогам score из кэша параметров
+        # NOTIFY без шансов попасть в выборку не вызывает полный запрос
+        self._last_signal_ids: frozenset = frozenset()
+        # Кэш параметров backtest (массивы для запроса) и пороги score по бирже
+        self._filters_cache: Optional[List[list]] = None
+        self._filters_cached_at = 0.0
+        self._score_filters: Dict[int, tuple] = {}
         self.stats = {
             'queries_executed': 0,
             'signals_sent': 0,
@@ -94,6 +132,14 @@ class SignalWebSocketServer:
         if not self.binance_enabled and not self.bybit_enabled:
             raise ValueError("At least one exchange must be enabled (BINANCE_ENABLED or BYBIT_ENABLED)")
 
+        # Пустой снимок до первой загрузки, чтобы get_signals было что отправить
+        self.set_last_signals([])
+
+        # SQL запросы не меняются во время работы - формируем один раз;
+        # окно и пороги передаются параметрами, asyncpg кэширует prepared statement
+        self.params_query = self.build_params_query()
+        self.signal_query = self.build_signal_query()
+
         logger.info(f"Signal WebSocket Server initialized on {self.host}:{self.port}")
         logger.info(f"Hybrid mode: NOTIFY={'enabled' if self.use_notify else 'disabled'}, "
                    f"Lightweight check interval={self.lightweight_check_interval}s")
@@ -101,40 +147,46 @@ class SignalWebSocketServer:
                    f"Binance={'enabled' if self.binance_enabled else 'disabled'}, "
                    f"Bybit={'enabled' if self.bybit_enabled else 'disabled'}")
 
-    def hash_token(self, token: str) -> str:
-        """Хеширование токена для безопасного сравнения"""
-        return hashlib.sha256(token.encode()).hexdigest()
+    def hash_token(self, token: str) -> bytes:
+        """Хеширование токена для безопасного сравнения (сырой SHA-256 digest)"""
+        return hashlib.sha256(token.encode()).digest()
 
-    def build_signal_query(self) -> str:
+    # Биржи: exchange_id и суффикс таблицы web.backtest_summary_*
+    EXCHANGES = (
+        (1, 'binance', 'Binance'),
+        (2, 'bybit', 'Bybit'),
+    )
+
+    # Параметры backtest меняются с частотой бэктестов (часы), а не
+    # сигналов - кэшируются в процессе на FILTERS_TTL секунд
+    FILTERS_TTL = 300
+
+    def enabled_exchanges(self) -> list:
+        """Включенные биржи из EXCHANGES"""
+        flags = {1: self.binance_enabled, 2: self.bybit_enabled}
+        return [exchange for exchange in self.EXCHANGES if flags[exchange[0]]]
+
+    def build_params_query(self) -> str:
         """
-        Формирует динамический SQL запрос в зависимости от включенных бирж
-        Возвращает запрос с placeholder '%s' для signal_window_minutes
+        Формирует SQL запрос параметров backtest (один раз при запуске)
+        По строке на включенную биржу: exchange_id и 6 порогов лучшего summary
         """
-        # Определяем какие exchange_id включены
-        enabled_exchanges = []
-        if self.binance_enabled:
-            enabled_exchanges.append('1')
-        if self.bybit_enabled:
-            enabled_exchanges.append('2')
+        enabled = self.enabled_exchanges()
 
-        # Формируем список для WHERE IN clause
-        exchange_filter = ', '.join(enabled_exchanges)
-
-        # Базовый SQL запрос (тот же что был, но с дополнительным фильтром)
-        query = f"""
--- 1. CTE для поиска ЛУЧШЕГО ID для Binance (по вашей новой логике)
-WITH best_binance_id AS (
+        # 1-2. CTE для поиска ЛУЧШЕГО summary_id каждой включенной биржи
+        best_id_ctes = ',\n\n'.join(f"""-- CTE для поиска ЛУЧШЕГО ID для {label} (по вашей новой логике)
+best_{table}_id AS (
     WITH FilteredSummaries AS (
         SELECT DISTINCT ON (total_pnl_usd)
             summary_id,
             win_rate,
             total_pnl_usd
         FROM
-            web.backtest_summary_binance
+            web.backtest_summary_{table}
         WHERE
             total_pnl_usd >= (
                 SELECT MAX(total_pnl_usd)
-                FROM web.backtest_summary_binance
+                FROM web.backtest_summary_{table}
             ) * 0.95
         ORDER BY
             total_pnl_usd DESC,
@@ -147,81 +199,58 @@ WITH best_binance_id AS (
     ORDER BY
         win_rate DESC
     LIMIT 1
-),
+)""" for exchange_id, table, label in enabled)
 
--- 2. CTE для поиска ЛУЧШЕГО ID для Bybit (по вашей новой логике)
-best_bybit_id AS (
-    WITH FilteredSummaries AS (
-        SELECT DISTINCT ON (total_pnl_usd)
-            summary_id,
-            win_rate,
-            total_pnl_usd
-        FROM
-            web.backtest_summary_bybit
-        WHERE
-            total_pnl_usd >= (
-                SELECT MAX(total_pnl_usd)
-                FROM web.backtest_summary_bybit
-            ) * 0.95
-        ORDER BY
-            total_pnl_usd DESC,
-            win_rate DESC
-    )
+        # 3. Параметры по найденным ID (UNION ALL только для двух бирж)
+        best_params = '\n\nUNION ALL\n\n'.join(f"""( -- Параметры для {label}
     SELECT
-        summary_id
-    FROM
-        FilteredSummaries
-    ORDER BY
-        win_rate DESC
-    LIMIT 1
-),
-
--- 3. Теперь создаем CTE с ПАРАМЕТРАМИ, используя найденные ID
-all_best_params AS (
-    ( -- Параметры для Binance
-        SELECT
-            1 AS exchange_id,
-            score_week_filter,
-            score_month_filter,
-            max_trades_filter,
-            stop_loss_filter,
-            trailing_activation_filter,
-            trailing_distance_filter
-        FROM web.backtest_summary_binance
-        -- Используем ID из CTE 1
-        WHERE summary_id = (SELECT summary_id FROM best_binance_id)
-    )
+        {exchange_id} AS exchange_id,
+        score_week_filter,
+        score_month_filter,
+        max_trades_filter::int AS max_trades_filter,
+        stop_loss_filter,
+        trailing_activation_filter,
+        trailing_distance_filter
+    FROM web.backtest_summary_{table}
+    WHERE summary_id = (SELECT summary_id FROM best_{table}_id)
+)""" for exchange_id, table, label in enabled)
+
+        return f"""
+WITH {best_id_ctes}
+
+{best_params};
+"""
 
-    UNION ALL
-
-    ( -- Параметры для Bybit
-        SELECT
-            2 AS exchange_id,
-            score_week_filter,
-            score_month_filter,
-            max_trades_filter,
-            stop_loss_filter,
-            trailing_activation_filter,
-            trailing_distance_filter
-        FROM web.backtest_summary_bybit
-        -- Используем ID из CTE 2
-        WHERE summary_id = (SELECT summary_id FROM best_bybit_id)
-    )
-)
+    def build_signal_query(self) -> str:
+        """
+        Формирует SQL запрос сигналов (один раз при запуске)
+        Параметры backtest не вычисляются в запросе, а передаются массивами
+        из кэша (get_backtest_filters) - по элементу на включенную биржу
+        Возвращает параметризованный запрос: $1 - signal_window_minutes,
+        $2..$8 - exchange_id и 6 порогов backtest
+        """
+        enabled = self.enabled_exchanges()
 
--- 4. Основной запрос к сигналам
+        # JOIN с параметрами уже оставляет только включенные биржи;
+        # для одной биржи условие пишем явно, чтобы planner сузил trading_pairs
+        exchange_filter = (
+            f"\n    AND tp.exchange_id = {enabled[0][0]}" if len(enabled) == 1 else ""
+        )
+
+        query = f"""
+-- Основной запрос к сигналам
 SELECT
     sc.id,
     sc.pair_symbol,
     sc.recommended_action,
-    sc.score_week,
-    sc.score_month,
+    COALESCE(sc.score_week, 0) AS score_week,
+    COALESCE(sc.score_month, 0) AS score_month,
     sc.timestamp,
     sc.created_at,
     sc.trading_pair_id,
     tp.exchange_id,
 
-    -- 5. Выводим параметры, которые "приехали" из CTE 3
+    -- Параметры backtest включенных бирж (из кэша, см. build_params_query)
     bp.score_week_filter,
     bp.score_month_filter,
     bp.max_trades_filter,
@@ -231,20 +260,41 @@ SELECT
 
 FROM fas_v2.scoring_history AS sc
 JOIN public.trading_pairs AS tp ON sc.trading_pair_id = tp.id
-JOIN all_best_params AS bp ON tp.exchange_id = bp.exchange_id
+JOIN unnest(
+    $2::int[], $3::float8[], $4::float8[], $5::int[], $6::float8[], $7::float8[], $8::float8[]
+) AS bp(
+    exchange_id, score_week_filter, score_month_filter, max_trades_filter,
+    stop_loss_filter, trailing_activation_filter, trailing_distance_filter
+) ON tp.exchange_id = bp.exchange_id
 
 WHERE
-    sc.timestamp >= now() - INTERVAL '%s minutes'
+    sc.timestamp >= now() - make_interval(mins => $1)
     AND sc.is_active = true
     AND tp.is_active = true
     AND sc.score_week > bp.score_week_filter
     AND sc.score_month > bp.score_month_filter
-    AND EXTRACT(HOUR FROM sc.timestamp) NOT BETWEEN 0 AND 1
-    AND tp.exchange_id IN ({exchange_filter})
+    AND EXTRACT(HOUR FROM sc.timestamp) NOT BETWEEN 0 AND 1{exchange_filter}
 ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
 """
         return query
 
+    async def get_backtest_filters(self, conn: asyncpg.Connection) -> List[list]:
+        """
+        Параметры backtest для запроса сигналов: 7 массивов (exchange_id и
+        6 порогов) по элементу на биржу. Из БД читаются раз в FILTERS_TTL
+        """
+        now = time.monotonic()
+        if self._filters_cache is None or now - self._filters_cached_at >= self.FILTERS_TTL:
+            rows = await conn.fetch(self.params_query)
+            self._filters_cache = [[row[i] for row in rows] for i in range(7)]
+            self._score_filters = {
+                row['exchange_id']: (row['score_week_filter'], row['score_month_filter'])
+                for row in rows
+            }
+            self._filters_cached_at = now
+            logger.debug(f"Backtest filters refreshed for {len(rows)} exchanges")
+        return self._filters_cache
+
     async def init_db(self):
         """Инициализация пула соединений с БД"""
         try:
@@ -252,7 +302,8 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
                 **self.db_config,
                 min_size=2,
                 max_size=10,
-                command_timeout=60
+                command_timeout=60,
+                init=self.init_connection
             )
             logger.info("Database pool created successfully")
 
@@ -266,6 +317,16 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
             logger.error(f"Failed to initialize database: {e}")
             raise
 
+    async def init_connection(self, conn: asyncpg.Connection):
+        """Настройка нового соединения пула: numeric декодируется сразу в float"""
+        await conn.set_type_codec(
+            'numeric',
+            encoder=str,
+            decoder=float,
+            schema='pg_catalog',
+            format='text'
+        )
+
     async def init_notify_listener(self):
         """
         Инициализация PostgreSQL LISTEN/NOTIFY
@@ -296,66 +357,93 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
             self.notify_available = False
             return False
 
-    async def on_notify_received(self, connection, pid, channel, payload):
+    def on_notify_received(self, connection, pid, channel, payload):
         """
         Callback вызывается при получении NOTIFY от PostgreSQL
-        Обеспечивает мгновенную реакцию на новые сигналы (< 10ms)
+        Не обращается к БД: только помечает событие для _notify_consumer,
+        который схлопывает пачку уведомлений в один запрос
         """
+        needs_query = True
         try:
             # Парсим payload от триггера
             if payload:
-                data = json.loads(payload)
+                data = orjson.loads(payload)
                 logger.info(f"⚡ NOTIFY received: event={data.get('event')}, "
                           f"id={data.get('id')}, symbol={data.get('pair_symbol')}, "
                           f"score={data.get('score_week')}")
+                needs_query = self.notify_can_change_signals(data)
+                if not needs_query:
+                    logger.debug(f"Signal {data.get('id')} below backtest filters, query skipped")
             else:
                 logger.info(f"⚡ NOTIFY received from PID {pid}")
 
-            # Выполняем полный запрос и broadcast
-            await self.do_full_query_and_broadcast()
-
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             logger.warning(f"Invalid JSON in NOTIFY payload: {payload[:100]}")
-            # Все равно делаем запрос
-            await self.do_full_query_and_broadcast()
         except Exception as e:
             logger.error(f"Error processing NOTIFY: {e}")
             self.stats['errors'] += 1
+        finally:
+            # Все равно делаем запрос (кроме заведомо не проходящих сигналов)
+            if needs_query:
+                self._notify_event.set()
+
+    def notify_can_change_signals(self, data: dict) -> bool:
+        """
+        Может ли сигнал из NOTIFY изменить выборку?
+        False только если сигнала нет в снимке, а его score не проходит
+        пороги backtest ни одной включенной биржи. Пороги берутся из кэша
+        параметров; если для биржи их нет - считаем, что может (нужен запрос).
+        Пропущенный сигнал все равно заберет fallback проверка MAX(id)
+        """
+        if data.get('id') in self._last_signal_ids:
+            return True
+
+        score_week = data.get('score_week')
+        score_month = data.get('score_month')
+        if score_week is None or score_month is None:
+            return True
+
+        for exchange_id, enabled in ((1, self.binance_enabled), (2, self.bybit_enabled)):
+            if not enabled:
+                continue
+            filters = self._score_filters.get(exchange_id)
+            if filters is None or None in filters:
+                return True
+            if score_week > filters[0] and score_month > filters[1]:
+                return True
+
+        return False
+
+    async def _notify_consumer(self):
+        """
+        Обработчик NOTIFY событий: ждет debounce окно, чтобы пачка вставок
+        дала один полный запрос и один broadcast вместо K
+        """
+        while self.running:
+            try:
+                await self._notify_event.wait()
+                self._notify_event.clear()
+                await asyncio.sleep(self.notify_debounce_ms / 1000)
+                await self.do_full_query_and_broadcast()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in NOTIFY consumer: {e}")
+                self.stats['errors'] += 1
 
     async def fetch_signals(self) -> List[dict]:
         """Получение сигналов из БД"""
         try:
             async with self.db_pool.acquire() as conn:
-                # Формируем динамический запрос на основе включенных бирж
-                query = self.build_signal_query()
-
-                # Выполняем запрос
-                rows = await conn.fetch(
-                    query % self.signal_window_minutes
-                )
-
-                # Преобразуем в словари (15 полей: 9 основных + 6 из backtest)
-                signals = []
-                for row in rows:
-                    signal = {
-                        'id': row['id'],
-                        'pair_symbol': row['pair_symbol'],
-                        'recommended_action': row['recommended_action'],
-                        'score_week': float(row['score_week']) if row['score_week'] else 0,
-                        'score_month': float(row['score_month']) if row['score_month'] else 0,
-                        'timestamp': row['timestamp'].isoformat() if row['timestamp'] else None,
-                        'created_at': row['created_at'].isoformat() if row['created_at'] else None,
-                        'trading_pair_id': row['trading_pair_id'],
-                        'exchange_id': row['exchange_id'],
-                        # Параметры из backtest_summary
-                        'score_week_filter': float(row['score_week_filter']) if row['score_week_filter'] else None,
-                        'score_month_filter': float(row['score_month_filter']) if row['score_month_filter'] else None,
-                        'max_trades_filter': int(row['max_trades_filter']) if row['max_trades_filter'] else None,
-                        'stop_loss_filter': float(row['stop_loss_filter']) if row['stop_loss_filter'] else None,
-                        'trailing_activation_filter': float(row['trailing_activation_filter']) if row['trailing_activation_filter'] else None,
-                        'trailing_distance_filter': float(row['trailing_distance_filter']) if row['trailing_distance_filter'] else None
-                    }
-                    signals.append(signal)
+                # Выполняем подготовленный запрос (кэш statements asyncpg)
+                filters = await self.get_backtest_filters(conn)
+                rows = await conn.fetch(self.signal_query, self.signal_window_minutes, *filters)
+
+                # Преобразуем в словари (15 полей: 9 основных + 6 из backtest).
+                # Типы уже готовы: numeric приходит как float (codec пула),
+                # NULL в score заменяет COALESCE в запросе, datetime orjson
+                # пишет ISO строкой - пересобирать каждую строку не нужно
+                signals = [dict(row) for row in rows]
 
                 self.stats['queries_executed'] += 1
                 logger.debug(f"Fetched {len(signals)} signals from database")
@@ -367,46 +455,36 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
             self.stats['errors'] += 1
             return []
 
+    async def get_lightweight_stmt(self):
+        """
+        Подготовленный запрос lightweight проверки на отдельном соединении
+        Соединение (и запрос) создается заново, если оно было закрыто
+        """
+        if self.lightweight_connection is None or self.lightweight_connection.is_closed():
+            self.lightweight_connection = await asyncpg.connect(**self.db_config)
+            self._lightweight_stmt = await self.lightweight_connection.prepare(
+                "SELECT MAX(id) AS max_id FROM fas_v2.scoring_history"
+            )
+        return self._lightweight_stmt
+
     async def check_for_changes_lightweight(self) -> bool:
         """
         Легковесная проверка: появились ли новые сигналы?
-        Запрос выполняется за ~1-2ms вместо ~50-100ms полного запроса
-        Проверяет только MAX(id) и MAX(timestamp)
+        Index-only проба MAX(id) по первичному ключу вместо сканирования окна
+        (без JOIN и COUNT). Ложные срабатывания стоят лишь одного лишнего
+        полного запроса, который применяет все фильтры
         """
         try:
-            async with self.db_pool.acquire() as conn:
-                result = await conn.fetchrow("""
-                    SELECT
-                        MAX(sc.id) as max_id,
-                        MAX(sc.timestamp) as max_timestamp,
-                        COUNT(*) as total_count
-                    FROM fas_v2.scoring_history sc
-                    JOIN public.trading_pairs tp ON sc.trading_pair_id = tp.id
-                    WHERE sc.timestamp >= now() - INTERVAL '%s minutes'
-                        AND sc.is_active = true
-                        AND tp.is_active = true
-                        AND sc.score_week > 50
-                        AND sc.score_month > 50
-                """ % self.signal_window_minutes)
-
-                if not result or not result['max_id']:
-                    return False
-
-                max_id = result['max_id']
-                max_ts = result['max_timestamp']
-
-                # Проверяем изменения
-                has_changes = (
-                    max_id > self.last_max_id or
-                    (max_ts and max_ts != self.last_check_timestamp)
-                )
-
-                if has_changes:
-                    self.last_max_id = max_id
-                    self.last_check_timestamp = max_ts
-                    logger.debug(f"Changes detected: max_id={max_id}, count={result['total_count']}")
-
-                return has_changes
+            stmt = await self.get_lightweight_stmt()
+            max_id = await stmt.fetchval()
+
+            if not max_id or max_id <= self.last_max_id:
+                return False
+
+            self.last_max_id = max_id
+            logger.debug(f"Changes detected: max_id={max_id}")
+
+            return True
 
         except Exception as e:
             logger.error(f"Error in lightweight check: {e}")
@@ -417,14 +495,21 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
         Выполняет полный запрос сигналов и рассылку всем клиентам
         Используется как при NOTIFY, так и при обнаружении изменений в polling mode
         """
+        # NOTIFY consumer и polling не гоняют два полных запроса разом
+        async with self._fetch_lock:
+            await self._do_full_query_and_broadcast()
+
+    async def _do_full_query_and_broadcast(self):
+        """Тело do_full_query_and_broadcast (вызывается под _fetch_lock)"""
         try:
             signals = await self.fetch_signals()
-            self.last_signals = signals
-            await self.broadcast_signals(signals)
+            self.set_last_signals(signals)
+            await self.broadcast_signals(self._last_payload_bytes)
 
-            # Подсчет сигналов по биржам для логирования
-            binance_count = len([s for s in signals if s['exchange_id'] == 1])
-            bybit_count = len([s for s in signals if s['exchange_id'] == 2])
+            # Подсчет сигналов по биржам для логирования: один проход,
+            # запрос возвращает только exchange_id 1 и 2
+            binance_count = sum(1 for s in signals if s['exchange_id'] == 1)
+            bybit_count = len(signals) - binance_count
 
             logger.info(f"📡 Broadcast {len(signals)} signals to {len(self.authenticated_clients)} clients "
                        f"(Binance: {binance_count}, Bybit: {bybit_count})")
@@ -432,31 +517,49 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
             logger.error(f"Error in full query and broadcast: {e}")
             self.stats['errors'] += 1
 
-    async def broadcast_signals(self, signals: List[dict]):
-        """Отправка сигналов всем аутентифицированным клиентам"""
-        if not self.authenticated_clients:
-            return
-
-        # Подготовка сообщения
-        message = json.dumps({
+    def set_last_signals(self, signals: List[dict]):
+        """
+        Сохраняет последние сигналы и кодирует сообщение для них один раз
+        orjson кодирует сразу в bytes (datetime - ISO строкой без isoformat())
+        """
+        self.last_signals = signals
+        self._last_signal_ids = frozenset(s['id'] for s in signals)
+        self._last_payload_bytes = orjson.dumps({
             'type': 'signals',
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': datetime.now(),
             'count': len(signals),
             'data': signals
         })
 
-        # Отправка всем аутентифицированным клиентам
+    async def broadcast_signals(self, message: bytes):
+        """Отправка закодированного сообщения всем аутентифицированным клиентам"""
+        if not self.authenticated_clients:
+            return
+
+        # Параллельная отправка всем аутентифицированным клиентам:
+        # медленный клиент не задерживает остальных. Большая рассылка идет
+        # пачками, между ними event loop принимает подключения и NOTIFY
+        clients = list(self.authenticated_clients)
         disconnected = set()
 
-        for client in self.authenticated_clients:
-            try:
-                await client.send(message)
-                self.stats['signals_sent'] += 1
-            except websockets.exceptions.ConnectionClosed:
-                disconnected.add(client)
-            except Exception as e:
-                logger.error(f"Error sending to client: {e}")
-                disconnected.add(client)
+        for i in range(0, len(clients), self.BROADCAST_BATCH_SIZE):
+            if i:
+                await asyncio.sleep(0)
+            batch = clients[i:i + self.BROADCAST_BATCH_SIZE]
+            results = await asyncio.gather(
+                *(client.send(message) for client in batch),
+                return_exceptions=True
+            )
+
+            for client, result in zip(batch, results):
+                if isinstance(result, websockets.exceptions.ConnectionClosed):
+                    disconnected.add(client)
+                elif isinstance(result, Exception):
+                    logger.error(f"Error sending to client: {result}")
+                    disconnected.add(client)
+
+        # Счетчик обновляется один раз на broadcast, а не на каждого клиента
+        self.stats['signals_sent'] += len(clients) - len(disconnected)
 
         # Удаление отключенных клиентов
         for client in disconnected:
@@ -465,26 +568,34 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
     async def handle_client(self, websocket):
         """Обработка подключения клиента"""
         # Регистрация клиента
-        self.connected_clients.add(websocket)
         client_ip = websocket.remote_address[0] if websocket.remote_address else 'unknown'
-
-        self.client_info[websocket] = {
-            'ip': client_ip,
-            'connected_at': datetime.now(),
-            'authenticated': False
-        }
+        self.clients[websocket] = ClientState(ip=client_ip, connected_at=datetime.now())
 
         logger.info(f"New client connected from {client_ip}")
 
         try:
             # Отправляем запрос аутентификации
-            await websocket.send(json.dumps({
+            await websocket.send(orjson.dumps({
                 'type': 'auth_required',
                 'message': 'Please authenticate with your token'
             }))
 
-            # Ждем аутентификацию (30 секунд таймаут)
-            auth_task = asyncio.create_task(self.wait_for_auth(websocket))
+            # Первое сообщение должно быть аутентификацией (30 секунд таймаут)
+            try:
+                message = await asyncio.wait_for(websocket.recv(), timeout=30.0)
+            except asyncio.TimeoutError:
+                logger.warning(f"Client {client_ip} failed to authenticate in time")
+                await websocket.send(orjson.dumps({
+                    'type': 'error',
+                    'message': 'Authentication timeout'
+                }))
+                await websocket.close(code=4001, reason='Authentication timeout')
+                return
+
+            await self.handle_message(websocket, message)
+            if websocket not in self.authenticated_clients:
+                await websocket.close(code=4001, reason='Authentication required')
+                return
 
             # Основной цикл обработки сообщений
             async for message in websocket:
@@ -496,45 +607,27 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
             logger.error(f"Error handling client {client_ip}: {e}")
         finally:
             await self.disconnect_client(websocket)
-            auth_task.cancel()
-
-    async def wait_for_auth(self, websocket):
-        """Ожидание аутентификации с таймаутом"""
-        await asyncio.sleep(30)
-
-        if websocket in self.connected_clients and websocket not in self.authenticated_clients:
-            logger.warning(f"Client {self.client_info[websocket]['ip']} failed to authenticate in time")
-            await websocket.send(json.dumps({
-                'type': 'error',
-                'message': 'Authentication timeout'
-            }))
-            await websocket.close()
 
     async def handle_message(self, websocket, message: str):
         """Обработка сообщения от клиента"""
         try:
-            data = json.loads(message)
+            data = orjson.loads(message)
             msg_type = data.get('type')
 
             if msg_type == 'auth':
                 await self.handle_auth(websocket, data)
             elif msg_type == 'ping':
-                await websocket.send(json.dumps({'type': 'pong'}))
+                await websocket.send(orjson.dumps({'type': 'pong'}))
             elif msg_type == 'get_stats':
                 await self.send_stats(websocket)
             elif msg_type == 'get_signals':
                 # Немедленная отправка последних сигналов
                 if websocket in self.authenticated_clients:
-                    await websocket.send(json.dumps({
-                        'type': 'signals',
-                        'timestamp': datetime.now().isoformat(),
-                        'count': len(self.last_signals),
-                        'data': self.last_signals
-                    }))
+                    await websocket.send(self._last_payload_bytes)
             else:
                 logger.warning(f"Unknown message type: {msg_type}")
 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             logger.error(f"Invalid JSON from client: {message[:100]}")
         except Exception as e:
             logger.error(f"Error handling message: {e}")
@@ -544,20 +637,22 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
         token = data.get('token')
 
         if not token:
-            await websocket.send(json.dumps({
+            await websocket.send(orjson.dumps({
                 'type': 'auth_failed',
                 'message': 'Token required'
             }))
             return
 
         # Проверка токена
-        if self.hash_token(token) == self.auth_token:
+        # Сравнение за постоянное время (без timing-оракула)
+        if hmac.compare_digest(self.hash_token(token), self._auth_token_bytes):
+            state = self.clients[websocket]
+            state.authenticated = True
             self.authenticated_clients.add(websocket)
-            self.client_info[websocket]['authenticated'] = True
 
-            logger.info(f"Client {self.client_info[websocket]['ip']} authenticated successfully")
+            logger.info(f"Client {state.ip} authenticated successfully")
 
-            await websocket.send(json.dumps({
+            await websocket.send(orjson.dumps({
                 'type': 'auth_success',
                 'message': 'Authentication successful',
                 'query_interval': self.query_interval,
@@ -566,15 +661,10 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
 
             # Отправляем последние сигналы сразу после аутентификации
             if self.last_signals:
-                await websocket.send(json.dumps({
-                    'type': 'signals',
-                    'timestamp': datetime.now().isoformat(),
-                    'count': len(self.last_signals),
-                    'data': self.last_signals
-                }))
+                await websocket.send(self._last_payload_bytes)
         else:
-            logger.warning(f"Authentication failed for {self.client_info[websocket]['ip']}")
-            await websocket.send(json.dumps({
+            logger.warning(f"Authentication failed for {self.clients[websocket].ip}")
+            await websocket.send(orjson.dumps({
                 'type': 'auth_failed',
                 'message': 'Invalid token'
             }))
@@ -588,10 +678,10 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
 
         uptime = (datetime.now() - self.stats['start_time']).total_seconds()
 
-        await websocket.send(json.dumps({
+        await websocket.send(orjson.dumps({
             'type': 'stats',
             'uptime_seconds': uptime,
-            'connected_clients': len(self.connected_clients),
+            'connected_clients': len(self.clients),
             'authenticated_clients': len(self.authenticated_clients),
             'queries_executed': self.stats['queries_executed'],
             'signals_sent': self.stats['signals_sent'],
@@ -601,12 +691,12 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
 
     async def disconnect_client(self, websocket):
         """Отключение клиента"""
-        self.connected_clients.discard(websocket)
-        self.authenticated_clients.discard(websocket)
+        state = self.clients.pop(websocket, None)
+        if state is None:
+            return
 
-        if websocket in self.client_info:
-            logger.info(f"Client {self.client_info[websocket]['ip']} disconnected")
-            del self.client_info[websocket]
+        self.authenticated_clients.discard(websocket)
+        logger.info(f"Client {state.ip} disconnected")
 
     async def smart_query_loop(self):
         """
@@ -614,7 +704,7 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
         - Если NOTIFY доступен: fallback проверка раз в 60 сек (safety net)
         - Если NOTIFY недоступен: легковесные проверки каждую секунду
         """
-        last_full_query = datetime.now()
+        last_full_query = time.monotonic()
 
         while self.running:
             try:
@@ -627,7 +717,7 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
                     logger.debug("Fallback check (NOTIFY mode, safety net)")
                     if await self.check_for_changes_lightweight():
                         await self.do_full_query_and_broadcast()
-                        last_full_query = datetime.now()
+                        last_full_query = time.monotonic()
 
                 else:
                     # ===== POLLING MODE =====
@@ -635,12 +725,12 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
                     has_changes = await self.check_for_changes_lightweight()
 
                     # Принудительный полный запрос каждые N секунд (safety net)
-                    time_since_last = (datetime.now() - last_full_query).total_seconds()
+                    time_since_last = time.monotonic() - last_full_query
                     force_full_query = time_since_last >= self.query_interval
 
                     if has_changes or force_full_query:
                         await self.do_full_query_and_broadcast()
-                        last_full_query = datetime.now()
+                        last_full_query = time.monotonic()
                     else:
                         logger.debug("No changes detected, skipping full query")
 
@@ -665,7 +755,7 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
         await self.init_notify_listener()
 
         # Загрузка начальных сигналов
-        self.last_signals = await self.fetch_signals()
+        self.set_last_signals(await self.fetch_signals())
         logger.info(f"✓ Initial signals loaded: {len(self.last_signals)} signals")
 
         self.running = True
@@ -674,14 +764,16 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
         if self.notify_available:
             logger.info("🚀 Running in NOTIFY mode (event-driven)")
             logger.info(f"   - Latency: < 10ms")
+            logger.info(f"   - Debounce: {self.notify_debounce_ms}ms")
             logger.info(f"   - Fallback check: every {self.notify_fallback_interval}s")
         else:
             logger.info("🚀 Running in POLLING mode (lightweight checks)")
             logger.info(f"   - Check interval: {self.lightweight_check_interval}s")
             logger.info(f"   - Full query fallback: every {self.query_interval}s")
 
-        # Запуск умного цикла опроса
+        # Запуск умного цикла опроса и обработчика NOTIFY
         query_task = asyncio.create_task(self.smart_query_loop())
+        notify_task = asyncio.create_task(self._notify_consumer())
 
         # Запуск WebSocket сервера
         async with websockets.serve(
@@ -702,11 +794,12 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
             finally:
                 self.running = False
                 query_task.cancel()
+                notify_task.cancel()
 
                 # Закрываем все соединения
-                if self.connected_clients:
+                if self.clients:
                     await asyncio.gather(
-                        *[client.close() for client in self.connected_clients],
+                        *[client.close() for client in list(self.clients)],
                         return_exceptions=True
                     )
 
@@ -718,6 +811,13 @@ ORDER BY sc.score_week DESC NULLS LAST, sc.timestamp DESC;
                     except:
                         pass
 
+                # Закрываем соединение lightweight проверки
+                if self.lightweight_connection:
+                    try:
+                        await self.lightweight_connection.close()
+                    except:
+                        pass
+
                 # Закрываем пул БД
                 if self.db_pool:
                     await self.db_pool.close()
@@ -757,6 +857,7 @@ def main():
         'NOTIFY_CHANNEL': os.getenv('NOTIFY_CHANNEL', 'new_signals'),
         'LIGHTWEIGHT_CHECK_INTERVAL': os.getenv('LIGHTWEIGHT_CHECK_INTERVAL', '1'),
         'NOTIFY_FALLBACK_INTERVAL': os.getenv('NOTIFY_FALLBACK_INTERVAL', '60'),
+        'NOTIFY_DEBOUNCE_MS': os.getenv('NOTIFY_DEBOUNCE_MS', '10'),
 
         # Управление биржами
         'BINANCE_ENABLED': os.getenv('BINANCE_ENABLED', 'true'),
@@ -774,6 +875,11 @@ def main():
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
+    # uvloop ускоряет сокетный I/O websockets и asyncpg
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Using uvloop event loop")
+
     try:
         asyncio.run(server.start())
     except KeyboardInterrupt:
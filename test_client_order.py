@@ -11,53 +11,70 @@ from signal_websocket_client import SignalWebSocketClient
 
 logging.basicConfig(level=logging.INFO)
 
-async def test_client_order():
-    """Проверяет, сохраняет ли клиент сортировку сигналов"""
-    load_dotenv()
+# Окружение разбирается один раз при импорте
+load_dotenv()
+CLIENT_CONFIG = {
+    'SIGNAL_WS_URL': os.getenv('SIGNAL_WS_URL', 'ws://localhost:8765'),
+    'SIGNAL_WS_TOKEN': os.getenv('WS_AUTH_PASSWORD', 'secure_websocket_pass_2024'),
+    'AUTO_RECONNECT': False,
+    'SIGNAL_BUFFER_SIZE': 100
+}
+# Сколько пачек сигналов дождаться (порядок проверяется в каждой)
+EXPECTED_BATCHES = int(os.getenv('TEST_SIGNAL_BATCHES', 1))
+
 
-    config = {
-        'SIGNAL_WS_URL': os.getenv('SIGNAL_WS_URL', 'ws://localhost:8765'),
-        'SIGNAL_WS_TOKEN': os.getenv('WS_AUTH_PASSWORD', 'secure_websocket_pass_2024'),
-        'AUTO_RECONNECT': False,
-        'SIGNAL_BUFFER_SIZE': 100
-    }
+def first_order_violation(scores) -> int:
+    """Индекс первого элемента, нарушающего убывание (-1 если порядок верный)
 
-    client = SignalWebSocketClient(config)
+    Один проход с ранним выходом; общий для callback и проверки буфера
+    """
+    for i, (a, b) in enumerate(zip(scores, scores[1:]), 1):
+        if a < b:
+            return i
+    return -1
+
+
+async def test_client_order():
+    """Проверяет, сохраняет ли клиент сортировку сигналов"""
+    client = SignalWebSocketClient(dict(CLIENT_CONFIG))
     signals_received = []
+    batches_cv = asyncio.Condition()
 
     async def on_signals(signals):
         """Callback для получения сигналов"""
-        signals_received.append(signals)
+        async with batches_cv:
+            signals_received.append(signals)
+            batches_cv.notify_all()
         print(f"\n✅ Получено {len(signals)} сигналов через callback")
 
         # Проверяем сортировку
         print(f"\n{'№':<4} {'ID':<8} {'Symbol':<12} {'score_week':<12} {'Action'}")
         print("-" * 60)
 
+        # score_week извлекается один раз; порядок проверяется по всем
+        # сигналам одним проходом по соседним парам, а не только по топ-10
+        scores = [signal.get('score_week', 0) for signal in signals]
+        bad = first_order_violation(scores)
+
         prev_score = float('inf')
-        is_sorted = True
 
         for i, signal in enumerate(signals[:10], 1):  # Показываем топ-10
-            score_week = signal.get('score_week', 0)
+            score_week = scores[i - 1]
             symbol = signal.get('pair_symbol', 'N/A')
             action = signal.get('recommended_action', 'N/A')
             sig_id = signal.get('id', 'N/A')
 
-            if score_week > prev_score:
-                is_sorted = False
-                marker = "❌"
-            else:
-                marker = "✅"
+            marker = "❌" if score_week > prev_score else "✅"
 
             print(f"{marker} {i:<3} {sig_id:<8} {symbol:<12} {score_week:<12.2f} {action}")
             prev_score = score_week
 
         print("-" * 60)
 
-        if is_sorted:
+        if bad < 0:
             print("✅ Сигналы в callback отсортированы правильно")
         else:
-            print("❌ Сигналы в callback НЕ отсортированы!")
+            print(f"❌ Сигналы в callback НЕ отсортированы! (первое нарушение: #{bad + 1})")
 
         # Проверяем буфер
         print(f"\n📦 Проверка буфера клиента:")
@@ -65,13 +82,11 @@ async def test_client_order():
         print(f"   Размер буфера: {len(buffer)}")
 
         if buffer:
-            buffer_scores = [s.get('score_week', 0) for s in buffer[:5]]
-            print(f"   Топ-5 score_week в буфере: {buffer_scores}")
+            # Первые 11 элементов: 10 соседних пар для проверки порядка
+            buffer_scores = [s.get('score_week', 0) for s in buffer[:11]]
+            print(f"   Топ-5 score_week в буфере: {buffer_scores[:5]}")
 
-            buffer_sorted = all(buffer[i].get('score_week', 0) >= buffer[i+1].get('score_week', 0)
-                              for i in range(min(len(buffer)-1, 10)))
-
-            if buffer_sorted:
+            if first_order_violation(buffer_scores) < 0:
                 print("   ✅ Буфер отсортирован правильно")
             else:
                 print("   ❌ Буфер НЕ отсортирован!")
@@ -90,28 +105,41 @@ async def test_client_order():
 
         print("✅ Подключение успешно")
 
+        # connect() только авторизует - сообщения читает цикл run(),
+        # без него callback не вызовется
+        reader = asyncio.create_task(client.run())
+
         # Запрашиваем сигналы
         print("🎯 Запрашиваю сигналы...")
         await client.request_signals()
 
-        # Ждем получения сигналов
+        # Ждем получения сигналов: callback будит ожидающего на каждой
+        # пачке, без опроса
         print("⏳ Жду сигналы...")
-        for i in range(10):
-            await asyncio.sleep(0.5)
+        try:
+            async with batches_cv:
+                await asyncio.wait_for(
+                    batches_cv.wait_for(lambda: len(signals_received) >= EXPECTED_BATCHES),
+                    timeout=5.0
+                )
+        except asyncio.TimeoutError:
             if signals_received:
-                break
+                print(f"⚠️  Получено пачек: {len(signals_received)} из {EXPECTED_BATCHES}")
 
         if not signals_received:
             print("⚠️  Сигналы не получены!")
-            # Попробуем прочитать сообщение вручную
-            try:
-                message = await asyncio.wait_for(client.websocket.recv(), timeout=2)
-                print(f"📨 Получено сообщение: {message[:200]}")
-                await client.handle_message(message)
-            except asyncio.TimeoutError:
-                print("⏱️  Таймаут при ожидании сообщения")
+            # Ручное чтение - только если цикл run() упал: при живом
+            # reader второй recv() на том же сокете недопустим
+            if reader.done():
+                try:
+                    message = await asyncio.wait_for(client.websocket.recv(), timeout=2)
+                    print(f"📨 Получено сообщение: {message[:200]}")
+                    await client.handle_message(message)
+                except asyncio.TimeoutError:
+                    print("⏱️  Таймаут при ожидании сообщения")
 
         # Закрываем соединение
+        reader.cancel()
         await client.stop()
 
     except Exception as e:
@@ -4,8 +4,11 @@
 Показывает как будут отображаться данные с 15 полями
 """
 
+import io
 import json
+import sys
 from datetime import datetime
+from operator import itemgetter
 
 # Пример данных в новом формате (15 полей)
 sample_signals = [
@@ -62,6 +65,70 @@ sample_signals = [
     }
 ]
 
+# Поля таблиц: значения по умолчанию подмешиваются один раз, затем
+# itemgetter достает всю строку одним вызовом вместо .get() на каждое поле
+BASIC_DEFAULTS = {
+    'id': 'N/A',
+    'pair_symbol': 'N/A',
+    'recommended_action': 'N/A',
+    'score_week': 0,
+    'score_month': 0,
+    'timestamp': 'N/A',
+    'created_at': 'N/A',
+    'trading_pair_id': 'N/A',
+    'exchange_id': 'N/A'
+}
+BASIC_FIELDS = itemgetter(*BASIC_DEFAULTS)
+
+BACKTEST_DEFAULTS = {
+    'pair_symbol': 'N/A',
+    'score_week_filter': 'N/A',
+    'score_month_filter': 'N/A',
+    'max_trades_filter': 'N/A',
+    'stop_loss_filter': 'N/A',
+    'trailing_activation_filter': 'N/A',
+    'trailing_distance_filter': 'N/A'
+}
+BACKTEST_FIELDS = itemgetter(*BACKTEST_DEFAULTS)
+
+COMPACT_DEFAULTS = dict.fromkeys((
+    'id',
+    'pair_symbol',
+    'recommended_action',
+    'score_week',
+    'score_month',
+    'score_week_filter',
+    'score_month_filter',
+    'max_trades_filter',
+    'stop_loss_filter',
+    'trailing_activation_filter',
+    'trailing_distance_filter'
+))
+COMPACT_FIELDS = itemgetter(*COMPACT_DEFAULTS)
+
+# Заголовки и шаблоны строк разбираются один раз при импорте;
+# в циклах вызывается готовый bound-метод .format
+HEADER1 = (
+    f"{'#':<4} {'ID':<10} {'Symbol':<12} {'Action':<6} {'Week':<7} {'Month':<7} "
+    f"{'Timestamp':<22} {'Created At':<22} {'Pair ID':<8} {'Exch':<5}"
+)
+HEADER2 = (
+    f"{'#':<4} {'Symbol':<12} "
+    f"{'Week Filter':<12} {'Month Filter':<13} {'Max Trades':<11} "
+    f"{'Stop Loss %':<12} {'Trail Act %':<11} {'Trail Dist %':<13}"
+)
+# Даты: !s и точность .21 - то же, что str(value)[:21]
+ROW1_FMT = (
+    "{:<4} {:<10} {:<12} {:<6} {:<7.2f} {:<7.2f} "
+    "{!s:<22.21} {!s:<22.21} {:<8} {:<5}"
+).format
+ROW2_FMT = "{:<4} {:<12} {:<12} {:<13} {:<11} {:<12} {:<11} {:<13}".format
+COMPACT_FMT = (
+    "{}ID:{} {:<10} {:<4} W:{:.1f} M:{:.1f} | "
+    "Filters[W≥{} M≥{} MT:{} SL:{}% TA:{}% TD:{}%]\n"
+).format
+
+
 def demo_simple_format(signals):
     """Демонстрация простого табличного формата"""
     print(f"\n{'='*180}")
@@ -69,54 +136,27 @@ def demo_simple_format(signals):
     print(f"{'='*180}")
 
     # Table header - Part 1: Basic fields (9 fields)
-    print("\n📊 ОСНОВНЫЕ ПОЛЯ (9 полей):")
-    header1 = (
-        f"{'#':<4} {'ID':<10} {'Symbol':<12} {'Action':<6} {'Week':<7} {'Month':<7} "
-        f"{'Timestamp':<22} {'Created At':<22} {'Pair ID':<8} {'Exch':<5}"
-    )
-    print(header1)
-    print('-' * 110)
+    lines = [
+        "\n📊 ОСНОВНЫЕ ПОЛЯ (9 полей):",
+        HEADER1,
+        '-' * 110
+    ]
 
     # Table rows - Part 1
-    for i, signal in enumerate(signals, 1):
-        row1 = (
-            f"{i:<4} "
-            f"{signal.get('id', 'N/A'):<10} "
-            f"{signal.get('pair_symbol', 'N/A'):<12} "
-            f"{signal.get('recommended_action', 'N/A'):<6} "
-            f"{signal.get('score_week', 0):<7.2f} "
-            f"{signal.get('score_month', 0):<7.2f} "
-            f"{str(signal.get('timestamp', 'N/A'))[:21]:<22} "
-            f"{str(signal.get('created_at', 'N/A'))[:21]:<22} "
-            f"{signal.get('trading_pair_id', 'N/A'):<8} "
-            f"{signal.get('exchange_id', 'N/A'):<5}"
-        )
-        print(row1)
+    basic_rows = [BASIC_FIELDS({**BASIC_DEFAULTS, **signal}) for signal in signals]
+    lines.extend(ROW1_FMT(i, *row) for i, row in enumerate(basic_rows, 1))
 
     # Table header - Part 2: Backtest parameters (6 fields)
-    print("\n⚙️  ПАРАМЕТРЫ ИЗ BACKTEST_SUMMARY (6 полей):")
-    header2 = (
-        f"{'#':<4} {'Symbol':<12} "
-        f"{'Week Filter':<12} {'Month Filter':<13} {'Max Trades':<11} "
-        f"{'Stop Loss %':<12} {'Trail Act %':<11} {'Trail Dist %':<13}"
-    )
-    print(header2)
-    print('-' * 90)
+    lines.append("\n⚙️  ПАРАМЕТРЫ ИЗ BACKTEST_SUMMARY (6 полей):")
+    lines.append(HEADER2)
+    lines.append('-' * 90)
 
     # Table rows - Part 2
-    for i, signal in enumerate(signals, 1):
-        row2 = (
-            f"{i:<4} "
-            f"{signal.get('pair_symbol', 'N/A'):<12} "
-            f"{signal.get('score_week_filter', 'N/A'):<12} "
-            f"{signal.get('score_month_filter', 'N/A'):<13} "
-            f"{signal.get('max_trades_filter', 'N/A'):<11} "
-            f"{signal.get('stop_loss_filter', 'N/A'):<12} "
-            f"{signal.get('trailing_activation_filter', 'N/A'):<11} "
-            f"{signal.get('trailing_distance_filter', 'N/A'):<13}"
-        )
-        print(row2)
+    backtest_rows = [BACKTEST_FIELDS({**BACKTEST_DEFAULTS, **signal}) for signal in signals]
+    lines.extend(ROW2_FMT(i, *row) for i, row in enumerate(backtest_rows, 1))
 
+    # Вся таблица уходит в stdout одной записью, а не print() на строку
+    sys.stdout.write('\n'.join(lines) + '\n')
     print('=' * 180 + '\n')
 
 
@@ -126,22 +166,14 @@ def demo_compact_format(signals):
     print("КОМПАКТНЫЙ ФОРМАТ (одна строка на сигнал)")
     print("="*130 + "\n")
 
-    for signal in signals:
-        output = (
-            f"[{datetime.now().strftime('%H:%M:%S')}] "
-            f"ID:{signal.get('id')} "
-            f"{signal.get('pair_symbol'):<10} "
-            f"{signal.get('recommended_action'):<4} "
-            f"W:{signal.get('score_week'):.1f} "
-            f"M:{signal.get('score_month'):.1f} | "
-            f"Filters[W≥{signal.get('score_week_filter')} "
-            f"M≥{signal.get('score_month_filter')} "
-            f"MT:{signal.get('max_trades_filter')} "
-            f"SL:{signal.get('stop_loss_filter')}% "
-            f"TA:{signal.get('trailing_activation_filter')}% "
-            f"TD:{signal.get('trailing_distance_filter')}%]"
-        )
-        print(output)
+    # Время одно на весь вызов; строки копятся в буфере и выводятся
+    # одной записью в stdout
+    prefix = f"[{datetime.now().strftime('%H:%M:%S')}] "
+    buf = io.StringIO()
+    compact_rows = map(COMPACT_FIELDS, [{**COMPACT_DEFAULTS, **signal} for signal in signals])
+    for row in compact_rows:
+        buf.write(COMPACT_FMT(prefix, *row))
+    sys.stdout.write(buf.getvalue())
 
     print()
 
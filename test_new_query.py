@@ -6,46 +6,76 @@
 import asyncio
 import asyncpg
 import json
+from dataclasses import asdict, dataclass
+from datetime import datetime
 from dotenv import load_dotenv
 import os
 
+
+@dataclass(frozen=True, slots=True)
+class DbConfig:
+    """Параметры подключения к БД, читаются из окружения один раз"""
+    host: str
+    port: int
+    database: str
+    user: str
+    password: str
+
+
+# Окружение разбирается один раз при импорте
+load_dotenv()
+DB_CONFIG = DbConfig(
+    host=os.getenv('DB_HOST', 'localhost'),
+    port=int(os.getenv('DB_PORT', 5432)),
+    database=os.getenv('DB_NAME'),
+    user=os.getenv('DB_USER'),
+    password=os.getenv('DB_PASSWORD')
+)
+SIGNAL_WINDOW_MINUTES = int(os.getenv('SIGNAL_WINDOW_MINUTES', 32))
+
+
 async def test_query():
     """Тестирование обновленного SQL запроса"""
-    load_dotenv()
-
     # Подключение к БД
-    conn = await asyncpg.connect(
-        host=os.getenv('DB_HOST', 'localhost'),
-        port=int(os.getenv('DB_PORT', 5432)),
-        database=os.getenv('DB_NAME'),
-        user=os.getenv('DB_USER'),
-        password=os.getenv('DB_PASSWORD')
+    conn = await asyncpg.connect(**asdict(DB_CONFIG))
+    # Как в сервере: numeric декодируется сразу в float
+    await conn.set_type_codec(
+        'numeric',
+        encoder=str,
+        decoder=float,
+        schema='pg_catalog',
+        format='text'
     )
 
     print("=" * 80)
     print("Тестирование нового SQL запроса с backtest_summary параметрами")
     print("=" * 80)
 
-    # SQL запрос (тот же что в сервере)
-    query = """
-        WITH best_params AS (
-            SELECT
-                score_week_filter,
-                score_month_filter,
-                max_trades_filter,
-                stop_loss_filter,
-                trailing_activation_filter,
-                trailing_distance_filter
+    signal_window = SIGNAL_WINDOW_MINUTES
+
+    # Параметры из backtest_summary меняются редко: читаются отдельным
+    # запросом (в сервере - с TTL-кэшем) и передаются в основной как $2..$7
+    params_query = """
+        SELECT
+            score_week_filter,
+            score_month_filter,
+            max_trades_filter::int,
+            stop_loss_filter,
+            trailing_activation_filter,
+            trailing_distance_filter
+        FROM web.backtest_summary
+        WHERE summary_id IN (
+            SELECT summary_id
             FROM web.backtest_summary
-            WHERE summary_id IN (
-                SELECT summary_id
-                FROM web.backtest_summary
-                ORDER BY final_equity DESC
-                LIMIT 5
-            )
-            ORDER BY win_rate DESC
-            LIMIT 1
+            ORDER BY final_equity DESC
+            LIMIT 5
         )
+        ORDER BY win_rate DESC
+        LIMIT 1
+    """
+
+    # Основной запрос; окно - параметр $1
+    query = """
         SELECT
             sc.id,
             sc.pair_symbol,
@@ -56,16 +86,15 @@ async def test_query():
             sc.created_at,
             sc.trading_pair_id,
             tp.exchange_id,
-            bp.score_week_filter,
-            bp.score_month_filter,
-            bp.max_trades_filter,
-            bp.stop_loss_filter,
-            bp.trailing_activation_filter,
-            bp.trailing_distance_filter
+            $2::float8 AS score_week_filter,
+            $3::float8 AS score_month_filter,
+            $4::int AS max_trades_filter,
+            $5::float8 AS stop_loss_filter,
+            $6::float8 AS trailing_activation_filter,
+            $7::float8 AS trailing_distance_filter
         FROM fas_v2.scoring_history AS sc
         JOIN public.trading_pairs AS tp ON sc.trading_pair_id = tp.id
-        CROSS JOIN best_params AS bp
-        WHERE sc.timestamp >= now() - INTERVAL '32 minutes'
+        WHERE sc.timestamp >= now() - make_interval(mins => $1)
             AND sc.is_active = true
             AND tp.is_active = true
             AND sc.score_week > 50
@@ -77,7 +106,12 @@ async def test_query():
     try:
         # Выполнение запроса
         print("\n📊 Выполнение запроса...\n")
-        rows = await conn.fetch(query)
+        best_params = await conn.fetchrow(params_query)
+        if best_params is None:
+            print("⚠️  В web.backtest_summary нет параметров")
+            return
+
+        rows = await conn.fetch(query, signal_window, *best_params.values())
 
         print(f"✅ Получено сигналов: {len(rows)}\n")
 
@@ -102,22 +136,10 @@ async def test_query():
 
         # Проверка структуры данных
         if rows:
+            # Record -> dict целиком; отдельно приводятся только даты
             signal = {
-                'id': rows[0]['id'],
-                'pair_symbol': rows[0]['pair_symbol'],
-                'recommended_action': rows[0]['recommended_action'],
-                'score_week': float(rows[0]['score_week']) if rows[0]['score_week'] else 0,
-                'score_month': float(rows[0]['score_month']) if rows[0]['score_month'] else 0,
-                'timestamp': rows[0]['timestamp'].isoformat() if rows[0]['timestamp'] else None,
-                'created_at': rows[0]['created_at'].isoformat() if rows[0]['created_at'] else None,
-                'trading_pair_id': rows[0]['trading_pair_id'],
-                'exchange_id': rows[0]['exchange_id'],
-                'score_week_filter': float(rows[0]['score_week_filter']) if rows[0]['score_week_filter'] else None,
-                'score_month_filter': float(rows[0]['score_month_filter']) if rows[0]['score_month_filter'] else None,
-                'max_trades_filter': int(rows[0]['max_trades_filter']) if rows[0]['max_trades_filter'] else None,
-                'stop_loss_filter': float(rows[0]['stop_loss_filter']) if rows[0]['stop_loss_filter'] else None,
-                'trailing_activation_filter': float(rows[0]['trailing_activation_filter']) if rows[0]['trailing_activation_filter'] else None,
-                'trailing_distance_filter': float(rows[0]['trailing_distance_filter']) if rows[0]['trailing_distance_filter'] else None
+                key: value.isoformat() if isinstance(value, datetime) else value
+                for key, value in rows[0].items()
             }
 
             print("\n📦 JSON структура сигнала:")
@@ -8,47 +8,66 @@ import os
 from dotenv import load_dotenv
 import websockets
 
-async def test_signal_order():
-    """Проверяет порядок сигналов, получаемых от сервера"""
-    load_dotenv()
+try:
+    import orjson  # Быстрый JSON: принимает bytes, dumps возвращает bytes
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = json.loads
+    _dumps = json.dumps
+
+
+def message_type_is(raw, msg_type: str) -> bool:
+    """Проверка поля type без разбора всего JSON (сервер шлет компактный orjson)"""
+    if isinstance(raw, str):
+        raw = raw.encode()
+    return f'"type":"{msg_type}"'.encode() in raw
 
-    server_url = os.getenv('SIGNAL_WS_URL', 'ws://localhost:8765')
-    auth_token = os.getenv('WS_AUTH_PASSWORD', 'secure_websocket_pass_2024')
 
-    print(f"🔌 Подключаюсь к серверу: {server_url}")
+# Окружение разбирается один раз при импорте
+load_dotenv()
+SERVER_URL = os.getenv('SIGNAL_WS_URL', 'ws://localhost:8765')
+AUTH_TOKEN = os.getenv('WS_AUTH_PASSWORD', 'secure_websocket_pass_2024')
+
+
+async def test_signal_order():
+    """Проверяет порядок сигналов, получаемых от сервера"""
+    print(f"🔌 Подключаюсь к серверу: {SERVER_URL}")
 
     try:
-        async with websockets.connect(server_url) as websocket:
+        async with websockets.connect(SERVER_URL) as websocket:
             # Читаем auth_required
             auth_req = await websocket.recv()
-            print(f"📩 Получен запрос: {json.loads(auth_req)['type']}")
+            if message_type_is(auth_req, 'auth_required'):
+                print(f"📩 Получен запрос: auth_required")
+            else:
+                print(f"⚠️  Неожиданное сообщение: {auth_req[:200]}")
 
             # Отправляем токен
-            await websocket.send(json.dumps({
+            await websocket.send(_dumps({
                 'type': 'auth',
-                'token': auth_token
+                'token': AUTH_TOKEN
             }))
             print(f"🔑 Токен отправлен")
 
             # Читаем ответ на аутентификацию
             auth_response = await websocket.recv()
-            auth_data = json.loads(auth_response)
 
-            if auth_data.get('type') == 'auth_success':
+            if message_type_is(auth_response, 'auth_success'):
                 print(f"✅ Аутентификация успешна")
             else:
-                print(f"❌ Аутентификация не удалась: {auth_data}")
+                print(f"❌ Аутентификация не удалась: {auth_response[:200]}")
                 return
 
             # Ждем сигналы или запрашиваем их
             print(f"\n🎯 Запрашиваю сигналы...")
-            await websocket.send(json.dumps({
+            await websocket.send(_dumps({
                 'type': 'get_signals'
             }))
 
-            # Читаем ответ
+            # Читаем ответ: полный разбор нужен только для сигналов
             signals_msg = await websocket.recv()
-            signals_data = json.loads(signals_msg)
+            signals_data = _loads(signals_msg)
 
             if signals_data.get('type') == 'signals':
                 signals = signals_data.get('data', [])
@@ -65,22 +84,24 @@ async def test_signal_order():
                 print(f"\n{'№':<4} {'ID':<8} {'Symbol':<12} {'score_week':<12} {'score_month':<12} {'Action'}")
                 print("-" * 80)
 
+                # score_week извлекается один раз; порядок всех сигналов
+                # проверяется одним проходом по соседним парам, нарушения
+                # запоминаются по индексу
+                scores = [s.get('score_week', 0) for s in signals]
+                bad_idx = [i for i, (a, b) in enumerate(zip(scores, scores[1:])) if a < b]
+                is_sorted = not bad_idx
+
                 prev_score = float('inf')
-                is_sorted = True
 
-                for i, signal in enumerate(signals, 1):
-                    score_week = signal.get('score_week', 0)
+                for i, signal in enumerate(signals[:10], 1):  # Показываем топ-10
+                    score_week = scores[i - 1]
                     score_month = signal.get('score_month', 0)
                     symbol = signal.get('pair_symbol', 'N/A')
                     action = signal.get('recommended_action', 'N/A')
                     sig_id = signal.get('id', 'N/A')
 
                     # Проверяем порядок
-                    if score_week > prev_score:
-                        is_sorted = False
-                        marker = "❌"
-                    else:
-                        marker = "✅"
+                    marker = "❌" if score_week > prev_score else "✅"
 
                     print(f"{marker} {i:<3} {sig_id:<8} {symbol:<12} {score_week:<12.2f} {score_month:<12.2f} {action}")
                     prev_score = score_week
@@ -91,17 +112,10 @@ async def test_signal_order():
                     print("\n✅ СИГНАЛЫ ОТСОРТИРОВАНЫ ПРАВИЛЬНО (по убыванию score_week)")
                 else:
                     print("\n❌ СИГНАЛЫ НЕ ОТСОРТИРОВАНЫ! Найдены нарушения порядка")
-
-                # Дополнительная проверка
-                scores = [s.get('score_week', 0) for s in signals]
-                sorted_scores = sorted(scores, reverse=True)
-
-                if scores == sorted_scores:
-                    print("✅ Подтверждение: порядок соответствует сортировке DESC")
-                else:
-                    print("❌ Подтверждение: порядок НЕ соответствует сортировке DESC")
-                    print(f"\nПолучено:  {scores[:10]}")
-                    print(f"Ожидалось: {sorted_scores[:10]}")
+                    print(f"   Всего нарушений: {len(bad_idx)}")
+                    # Первые нарушения: позиция и пара соседних score_week
+                    for i in bad_idx[:5]:
+                        print(f"   #{i + 1} -> #{i + 2}: {scores[i]:.2f} < {scores[i + 1]:.2f}")
 
             else:
                 print(f"❌ Неожиданный тип сообщения: {signals_data.get('type')}")